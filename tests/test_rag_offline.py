@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 Testes Offline - Infraestrutura dos sistemas RAG
+
+Cobrem cache de extrações, carregamento de corpus, extração em lote,
+deduplicação de mídias, manifesto de envio e travessia de diretórios,
+sem acesso ao Vertex AI (o cliente Gemini é substituído por mocks).
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from pathlib import Path
+import logging
+
+# Configurar logging para testes
+logging.basicConfig(level=logging.WARNING)
+
+# Adicionar diretório do projeto ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestExtractionCache(unittest.TestCase):
+    """
+    💾 Testes do cache persistente de extrações
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.caminho_db = os.path.join(self.temp_dir, "cache", "extracao.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_banco_criado_no_primeiro_acesso(self):
+        """O banco (e seu diretório) só é criado quando usado"""
+        try:
+            from validai_rag_multimodal import _ExtractionCache
+
+            cache = _ExtractionCache(self.caminho_db)
+            self.assertFalse(os.path.exists(self.caminho_db))
+
+            self.assertIsNone(cache.obter("/a.png", 1, 2, "sig"))
+            self.assertTrue(os.path.exists(self.caminho_db))
+            cache.fechar()
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_salvar_obter_por_assinatura_e_hash(self):
+        """Entradas dependem da versão do arquivo e da assinatura das configurações"""
+        try:
+            from validai_rag_multimodal import _ExtractionCache
+
+            cache = _ExtractionCache(self.caminho_db)
+            cache.salvar("/a.png", 1, 2, "sig", "imagem", "IMAGEM: a.png\n\ntexto", b"h1")
+
+            self.assertEqual(cache.obter("/a.png", 1, 2, "sig"), "IMAGEM: a.png\n\ntexto")
+            self.assertIsNone(cache.obter("/a.png", 1, 2, "outra"))
+            self.assertIsNone(cache.obter("/a.png", 9, 2, "sig"))
+
+            self.assertEqual(cache.obter_por_hash(b"h1", "sig"), ("/a.png", "IMAGEM: a.png\n\ntexto"))
+            self.assertIsNone(cache.obter_por_hash(b"h1", "outra"))
+
+            # Persistência entre conexões
+            cache.fechar()
+            self.assertEqual(_ExtractionCache(self.caminho_db).obter("/a.png", 1, 2, "sig"),
+                             "IMAGEM: a.png\n\ntexto")
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_assinatura_muda_com_prompt_e_modelo(self):
+        """Prompt, modelo e pré-processamento fazem parte da chave do cache"""
+        try:
+            from validai_rag_multimodal import ProcessadorMultimodal
+
+            base = ProcessadorMultimodal({})
+            outro_prompt = ProcessadorMultimodal({'prompts': {'imagem': "Descreva"}})
+            outro_modelo = ProcessadorMultimodal({'modelo_vision': "outro-modelo"})
+            outro_lado = ProcessadorMultimodal({'image_max_lado': 512})
+
+            assinatura = base._assinatura_extracao('imagem')
+            self.assertNotEqual(assinatura, outro_prompt._assinatura_extracao('imagem'))
+            self.assertNotEqual(assinatura, outro_modelo._assinatura_extracao('imagem'))
+            self.assertNotEqual(assinatura, outro_lado._assinatura_extracao('imagem'))
+
+            # O prompt de imagem não afeta as extrações de vídeo
+            self.assertEqual(base._assinatura_extracao('video'), outro_prompt._assinatura_extracao('video'))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+
+class TestCorpusMultimodal(unittest.TestCase):
+    """
+    📋 Testes do carregamento de configurações de corpus multimodais
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.temp_dir, "corpus.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _carregar(self):
+        from validai_rag_multimodal import ValidAIRAGMultimodal
+
+        # Apenas o carregamento de configurações, sem conectar ao Google Cloud
+        sistema = ValidAIRAGMultimodal.__new__(ValidAIRAGMultimodal)
+        sistema.config = {'corpus_config_file': self.config_file}
+        sistema._carregar_configuracoes_corpus()
+        return sistema.corpus_configs
+
+    def test_validacao_entradas(self):
+        """Entradas inválidas são descritas por _validar_corpus"""
+        try:
+            from validai_rag_multimodal import _validar_corpus
+
+            valido = {'nome': "A", 'descricao': "", 'diretorio_local': ".",
+                      'bucket_path': "b", 'tipos_arquivo': [".txt"]}
+            self.assertIsNone(_validar_corpus(valido))
+            self.assertIsNotNone(_validar_corpus([]))
+            self.assertIn("ausentes", _validar_corpus({'nome': "A"}))
+            self.assertIn("desconhecidos", _validar_corpus({**valido, 'extra': 1}))
+            self.assertIn("tipos_arquivo", _validar_corpus({**valido, 'tipos_arquivo': ".txt"}))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_entradas_invalidas_ignoradas_no_carregamento(self):
+        """Corpus malformados são descartados ao carregar, sem falhar no uso"""
+        try:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'valido': {'nome': "Válido", 'descricao': "", 'diretorio_local': ".",
+                               'bucket_path': "b", 'tipos_arquivo': [".txt"]},
+                    'incompleto': {'nome': "Incompleto"},
+                }, f)
+
+            with self.assertLogs('validai_rag_multimodal', level='WARNING'):
+                corpus = self._carregar()
+
+            self.assertIn('valido', corpus)
+            self.assertNotIn('incompleto', corpus)
+            self.assertEqual(corpus['valido'].nome, "Válido")
+
+            # _LazyCorpusMap instancia cada configuração uma única vez
+            self.assertIs(corpus['valido'], corpus['valido'])
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_configuracoes_nao_compartilhadas(self):
+        """Alterar um corpus carregado não afeta padrões nem novos carregamentos"""
+        try:
+            from validai_rag_multimodal import _CORPUS_PADRAO
+
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump({'valido': {'nome': "Válido", 'descricao': "", 'diretorio_local': ".",
+                                      'bucket_path': "b", 'tipos_arquivo': [".txt"]}}, f)
+
+            padrao_original = list(_CORPUS_PADRAO['graficos_metricas']['tipos_arquivo'])
+
+            corpus = self._carregar()
+            corpus['valido'].tipos_arquivo.append(".xyz")
+            corpus['graficos_metricas'].tipos_arquivo.append(".xyz")
+
+            novo = self._carregar()
+            self.assertEqual(novo['valido'].tipos_arquivo, [".txt"])
+            self.assertEqual(_CORPUS_PADRAO['graficos_metricas']['tipos_arquivo'], padrao_original)
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+
+class TestExtracaoLote(unittest.TestCase):
+    """
+    📦 Testes da extração em lote (agrupamento e separação da resposta)
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _criar(self, nome: str, tamanho: int = 16) -> str:
+        caminho = os.path.join(self.temp_dir, nome)
+        with open(caminho, 'wb') as f:
+            f.write(os.urandom(tamanho))
+        return caminho
+
+    def test_separar_secoes(self):
+        """A resposta só é aceita com exatamente uma seção não vazia por arquivo"""
+        try:
+            from validai_rag_multimodal import _separar_secoes_lote
+
+            resposta = "=== ARQUIVO 1 ===\nprimeiro\n=== ARQUIVO 2 ===\nsegundo\n"
+            self.assertEqual(_separar_secoes_lote(resposta, 2), ["primeiro", "segundo"])
+            self.assertIsNone(_separar_secoes_lote(resposta, 3))
+            self.assertIsNone(_separar_secoes_lote("=== ARQUIVO 1 ===\n\n=== ARQUIVO 2 ===\nb", 2))
+            self.assertIsNone(_separar_secoes_lote(None, 1))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_planejar_lotes(self):
+        """Imagens e áudios pequenos são agrupados por tipo; vídeos e arquivos grandes vão sozinhos"""
+        try:
+            from validai_rag_multimodal import ProcessadorMultimodal
+
+            processador = ProcessadorMultimodal({'lote_max_mb': 1})
+            paths = [self._criar(f"img{i}.png") for i in range(3)]
+            paths.append(self._criar("grande.png", 2 * 1024 * 1024))
+            paths.append(self._criar("som.mp3"))
+            paths.append(self._criar("filme.mp4"))
+
+            planos = processador._planejar_lotes(paths, batch_size=2)
+
+            self.assertIn(('imagem', [0, 1]), planos)
+            self.assertIn(('imagem', [2]), planos)
+            self.assertIn(('imagem', [3]), planos)
+            self.assertIn(('audio', [4]), planos)
+            self.assertIn(('video', [5]), planos)
+            self.assertEqual(sorted(p for _, posicoes in planos for p in posicoes), list(range(len(paths))))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+
+class TestDeduplicacaoMidias(unittest.TestCase):
+    """
+    🔁 Testes da deduplicação de mídias idênticas no processamento do corpus
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.corpus_dir = os.path.join(self.temp_dir, "corpus")
+        os.makedirs(self.corpus_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _sistema(self):
+        from validai_rag_multimodal import (
+            ValidAIRAGMultimodal, ProcessadorMultimodal, _LazyCorpusMap
+        )
+
+        config = {
+            'extraction_cache_db': os.path.join(self.temp_dir, "cache.db"),
+            'lote_tamanho': 1,
+        }
+        sistema = ValidAIRAGMultimodal.__new__(ValidAIRAGMultimodal)
+        sistema.config = config
+        sistema._ext_dispatch = {}
+        sistema.processador_multimodal = ProcessadorMultimodal(config)
+        sistema.corpus_configs = _LazyCorpusMap({
+            'teste': {'nome': "Teste", 'descricao': "", 'diretorio_local': self.corpus_dir,
+                      'bucket_path': "b", 'tipos_arquivo': [".txt"]}
+        })
+
+        resposta = SimpleNamespace(text="descrição")
+        sistema.cliente_ia = MagicMock()
+        sistema.cliente_ia.aio.models.generate_content = AsyncMock(return_value=resposta)
+        return sistema
+
+    def _gravar(self, nome: str, conteudo: bytes) -> None:
+        with open(os.path.join(self.corpus_dir, nome), 'wb') as f:
+            f.write(conteudo)
+
+    def test_copias_extraidas_uma_vez(self):
+        """Cópias idênticas geram uma chamada; novas cópias em outra execução vêm do cache"""
+        try:
+            from validai_rag_multimodal import ProcessadorMultimodal, _iterar_textos_extraidos
+
+            self._gravar("a.png", b"imagem-1")
+            self._gravar("copia_a.png", b"imagem-1")
+            self._gravar("b.png", b"imagem-2")
+
+            with patch.object(ProcessadorMultimodal, '_processar_midia', return_value="midia"):
+                sistema = self._sistema()
+                estatisticas = sistema.processar_arquivos_multimodais('teste')
+
+                chamadas = sistema.cliente_ia.aio.models.generate_content.await_count
+                self.assertEqual(chamadas, 2)
+                self.assertEqual(estatisticas['total_textos_extraidos'], 3)
+
+                textos = {os.path.basename(item['arquivo']): item['texto']
+                          for item in _iterar_textos_extraidos(estatisticas)}
+                self.assertTrue(textos['copia_a.png'].startswith("IMAGEM: copia_a.png"))
+
+                # Nova cópia em outro caminho, em outra instância: reaproveita o cache pelo hash
+                self._gravar("outra_copia.png", b"imagem-2")
+                sistema = self._sistema()
+                estatisticas = sistema.processar_arquivos_multimodais('teste')
+
+                self.assertEqual(sistema.cliente_ia.aio.models.generate_content.await_count, 0)
+                self.assertEqual(estatisticas['total_textos_extraidos'], 4)
+                self.assertTrue(estatisticas['arquivo_textos'].endswith("textos_extraidos.jsonl"))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+
+class TestPercorrerDiretorio(unittest.TestCase):
+    """
+    📂 Testes da travessia de diretórios compartilhada pelos sistemas RAG
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, "sub", "interno"))
+        os.makedirs(os.path.join(self.temp_dir, ".oculto"))
+        for relativo in ("raiz.txt", "sub/interno/doc.txt", ".oculto/estado.json"):
+            Path(self.temp_dir, relativo).touch()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _relativos(self, entradas):
+        return sorted(os.path.relpath(entrada.path, self.temp_dir) for entrada in entradas)
+
+    def test_arquivos_e_diretorios(self):
+        """Modo padrão retorna só arquivos; incluir_diretorios retorna todas as entradas"""
+        try:
+            from validai_rag_comum import percorrer_diretorio
+
+            self.assertEqual(
+                self._relativos(percorrer_diretorio(self.temp_dir)),
+                [os.path.join(".oculto", "estado.json"), "raiz.txt", os.path.join("sub", "interno", "doc.txt")]
+            )
+            self.assertEqual(
+                self._relativos(percorrer_diretorio(self.temp_dir, ignorar_ocultos=True)),
+                ["raiz.txt", os.path.join("sub", "interno", "doc.txt")]
+            )
+            self.assertIn(os.path.join("sub", "interno"),
+                          self._relativos(percorrer_diretorio(self.temp_dir, incluir_diretorios=True)))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_link_simbolico_em_ciclo(self):
+        """Links para diretórios ancestrais não são seguidos"""
+        try:
+            from validai_rag_comum import percorrer_diretorio
+
+            try:
+                os.symlink(self.temp_dir, os.path.join(self.temp_dir, "sub", "ciclo"))
+            except (OSError, NotImplementedError) as e:
+                self.skipTest(f"Links simbólicos indisponíveis: {e}")
+
+            entradas = self._relativos(percorrer_diretorio(self.temp_dir, incluir_diretorios=True))
+            self.assertIn(os.path.join("sub", "ciclo"), entradas)
+            self.assertFalse(any(e.startswith(os.path.join("sub", "ciclo") + os.sep) for e in entradas))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_link_simbolico_para_arquivo(self):
+        """Links para arquivos regulares são retornados; links para diretórios não"""
+        try:
+            from validai_rag_comum import percorrer_diretorio
+
+            try:
+                os.symlink(os.path.join(self.temp_dir, "raiz.txt"), os.path.join(self.temp_dir, "sub", "atalho.txt"))
+                os.symlink(os.path.join(self.temp_dir, "sub", "interno"), os.path.join(self.temp_dir, "atalho_dir"))
+            except (OSError, NotImplementedError) as e:
+                self.skipTest(f"Links simbólicos indisponíveis: {e}")
+
+            arquivos = self._relativos(percorrer_diretorio(self.temp_dir))
+            self.assertIn(os.path.join("sub", "atalho.txt"), arquivos)
+            self.assertNotIn("atalho_dir", arquivos)
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+
+class TestRAGSistemaUtilitarios(unittest.TestCase):
+    """
+    🔑 Testes dos utilitários do gerenciador RAG (cache de respostas e manifesto)
+    """
+
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chave_consulta(self):
+        """A chave separa o tipo da consulta e independe da ordem dos corpus e de espaços"""
+        try:
+            from validai_rag_system import _chave_consulta
+
+            self.assertEqual(_chave_consulta("multi", ["a", "b"], " pergunta "),
+                             _chave_consulta("multi", ["b", "a"], "pergunta"))
+            self.assertNotEqual(_chave_consulta("multi", ["a"], "pergunta"),
+                                _chave_consulta("multi", ["a", "b"], "pergunta"))
+            # Consulta simples e multi-corpus com o mesmo corpus não compartilham resposta
+            self.assertNotEqual(_chave_consulta("unico", ["a"], "pergunta"),
+                                _chave_consulta("multi", ["a"], "pergunta"))
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+    def test_manifesto_upload(self):
+        """O manifesto é relido para o mesmo destino e ignorado para outro ou se corrompido"""
+        try:
+            from validai_rag_system import _carregar_manifesto, _salvar_manifesto, _MANIFESTO_UPLOAD
+
+            arquivos = {"doc.txt": [10, 123456789]}
+            _salvar_manifesto(self.temp_dir, "gs://bucket/prefixo", arquivos)
+
+            self.assertEqual(_carregar_manifesto(self.temp_dir, "gs://bucket/prefixo"), arquivos)
+            self.assertEqual(_carregar_manifesto(self.temp_dir, "gs://bucket/outro"), {})
+
+            (self.temp_dir / _MANIFESTO_UPLOAD).write_text("{corrompido", encoding='utf-8')
+            self.assertEqual(_carregar_manifesto(self.temp_dir, "gs://bucket/prefixo"), {})
+
+        except ImportError as e:
+            self.skipTest(f"Módulo não disponível: {e}")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
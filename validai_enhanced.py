@@ -14,8 +14,9 @@ import os
 import sys
 import warnings
 import logging
+import functools
 from pathlib import Path
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, Callable, List
 from dataclasses import dataclass
 import json
 
@@ -55,6 +56,12 @@ class ConfigValidAI:
     # Configurações de interface
     time_sleep: float = 0.006
     time_sleep_compare: float = 0.006
+    max_historico_turnos: int = 40  # Turnos mantidos nos chats RAG (0 = sem limite)
+    
+    # Configurações da fila do Gradio
+    # Cada evento simultâneo mantém uma conexão ativa com o Vertex AI
+    concurrency_limit: int = 16
+    tamanho_max_fila: int = 128
     
     # Configurações de diretórios
     temp_dir: str = "./temp_files"
@@ -74,6 +81,16 @@ class ConfigValidAI:
             ]
 
 
+def limitar_historico(history: List, limite: int) -> None:
+    """
+    Mantém apenas os últimos `limite` turnos do histórico do chat (in-place)
+    
+    Usado com ConfigValidAI.max_historico_turnos; limite 0 desativa o corte.
+    """
+    if limite and len(history) > limite:
+        del history[:-limite]
+
+
 class GerenciadorConfig:
     """
     📋 Gerenciador inteligente de configurações do ValidAI
@@ -323,6 +340,30 @@ class FeedbackManager:
             return f"{horas}h {minutos}min"
 
 
+def handler_seguro(prefixo: str, fallback: Optional[Callable[[str], Any]] = None) -> Callable:
+    """
+    🛡️ Decorador para handlers da interface que centraliza o tratamento de erros
+    
+    Qualquer exceção é registrada no log e convertida em mensagem amigável.
+    
+    Args:
+        prefixo: Texto que antecede a mensagem da exceção
+        fallback: Monta o retorno a partir da mensagem de erro (para handlers
+                  com várias saídas); por padrão retorna FeedbackManager.erro
+    """
+    def decorador(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                mensagem = f"{prefixo}: {e}"
+                logger.error(f"❌ {mensagem}")
+                return fallback(mensagem) if fallback else FeedbackManager.erro(mensagem)
+        return wrapper
+    return decorador
+
+
 class ValidAIEnhanced:
     """
     🚀 ValidAI Enhanced - Versão aprimorada do sistema de validação
@@ -799,6 +840,13 @@ class ValidAIEnhanced:
         # Criar interface
         interface = self.criar_interface_aprimorada()
         
+        # Fila com vários workers (o padrão do Gradio processa um evento por vez)
+        interface = interface.queue(
+            default_concurrency_limit=self.config.concurrency_limit,
+            max_size=self.config.tamanho_max_fila,
+            api_open=False
+        )
+        
         # Configurar parâmetros de execução
         launch_params = {
             'show_api': False,
@@ -9,10 +9,12 @@ com suporte a imagens, vídeos, áudios e outros tipos de mídia.
 
 import os
 import sys
+import argparse
 import warnings
 import logging
+import functools
 import gradio as gr
-from typing import Dict, Any, Optional, Tuple, List
+from typing import Dict, Any, Optional, Tuple, List, Iterator
 from pathlib import Path
 
 # Suprimir warnings
@@ -21,8 +23,9 @@ warnings.filterwarnings("ignore", message="The 'tuples' format for chatbot messa
 # Imports do ValidAI Enhanced
 from validai_enhanced import (
     ConfigValidAI, GerenciadorConfig, ValidadorArquivos, 
-    FeedbackManager
+    FeedbackManager, handler_seguro, limitar_historico
 )
+from backend.cache import SmartCache
 
 # Import do sistema RAG multimodal
 from validai_rag_multimodal import (
@@ -62,6 +65,12 @@ class ValidAIEnhancedMultimodal:
         self.validador_arquivos = ValidadorArquivos(self.config)
         self.feedback = FeedbackManager()
         
+        # Cache curto para estatísticas de corpus
+        self._cache_rag = SmartCache(max_size=32, default_ttl=30, cleanup_interval=0)
+        
+        # Respostas já geradas por (corpus, pergunta normalizada, contexto visual)
+        self._answer_cache = SmartCache(max_size=256, default_ttl=None, cleanup_interval=0)
+        
         # Configurar ambiente
         self._configurar_ambiente()
         
@@ -122,6 +131,8 @@ class ValidAIEnhancedMultimodal:
     
     def _inicializar_rag_multimodal(self) -> None:
         """Inicializa o sistema RAG multimodal"""
+        self._default_corpus_id = None
+        self._opcoes_corpus_multimodal: List[Tuple[str, str]] = []
         try:
             logger.info("🎭 Inicializando sistema RAG multimodal...")
             
@@ -139,6 +150,11 @@ class ValidAIEnhancedMultimodal:
             # Inicializar processador multimodal
             self.processador_multimodal = ProcessadorMultimodal(config_rag)
             
+            # Opções do seletor calculadas uma vez; o primeiro corpus fica pré-selecionado
+            self._opcoes_corpus_multimodal = self._obter_opcoes_corpus_multimodal()
+            opcoes = self._opcoes_corpus_multimodal
+            self._default_corpus_id = opcoes[0][1] if opcoes else None
+            
             logger.info("✅ Sistema RAG multimodal inicializado")
             
         except Exception as e:
@@ -151,8 +167,13 @@ class ValidAIEnhancedMultimodal:
         Cria interface completa com RAG multimodal
         
         Returns:
-            Interface Gradio configurada
+            Interface Gradio configurada (construída uma única vez por instância)
         """
+        return self._interface
+    
+    @functools.cached_property
+    def _interface(self) -> gr.Blocks:
+        """Constrói a interface multimodal (memoizada)"""
         logger.info("🎨 Criando interface multimodal...")
         
         # Criar chatbots
@@ -295,7 +316,8 @@ class ValidAIEnhancedMultimodal:
             # Seletor de corpus multimodal
             with gr.Row():
                 corpus_multimodal_dropdown = gr.Dropdown(
-                    choices=self._obter_opcoes_corpus_multimodal(),
+                    choices=self._opcoes_corpus_multimodal,
+                    value=self._default_corpus_id,
                     label="🎭 Selecionar Base Multimodal",
                     info="Bases com suporte a imagens, vídeos e áudios"
                 )
@@ -303,8 +325,13 @@ class ValidAIEnhancedMultimodal:
                 refresh_multimodal_btn = gr.Button("🔄 Atualizar", size="sm")
             
             # Status do corpus multimodal
+            if self._default_corpus_id:
+                nome_padrao = self.rag_multimodal.corpus_configs[self._default_corpus_id].nome
+                status_inicial = self.feedback.info(f"{nome_padrao} selecionado")
+            else:
+                status_inicial = self.feedback.info("Selecione uma base multimodal para começar")
             corpus_multimodal_status = gr.HTML(
-                value=self.feedback.info("Selecione uma base multimodal para começar")
+                value=status_inicial
             )
             
             # Painel de processamento multimodal
@@ -348,8 +375,7 @@ class ValidAIEnhancedMultimodal:
                 clear_multimodal_btn = gr.Button("🗑️ Limpar", size="sm")
             
             # Estados para RAG multimodal
-            corpus_multimodal_state = gr.State(None)
-            chat_multimodal_history = gr.State([])
+            corpus_multimodal_state = gr.State(self._default_corpus_id)
             
             # Conectar eventos
             self._conectar_eventos_rag_multimodal(
@@ -357,7 +383,7 @@ class ValidAIEnhancedMultimodal:
                 process_media_btn, extract_texts_btn, save_extracts_btn, view_stats_btn,
                 processing_status, processing_output,
                 chatbot_multimodal, msg_multimodal_input, send_multimodal_btn,
-                include_visual_context, clear_multimodal_btn, chat_multimodal_history,
+                include_visual_context, clear_multimodal_btn,
                 refresh_multimodal_btn
             )
     
@@ -590,25 +616,25 @@ class ValidAIEnhancedMultimodal:
             logger.warning(f"⚠️ Erro no processamento multimodal: {e}. Usando função original.")
             return self.componentes_originais['chat_functions']['multimodal'](message, history, *args)
     
+    @handler_seguro("Erro na análise")
     def _analisar_midia_individual(self, arquivo, tipo_analise, prompt_personalizado):
         """Analisa um arquivo de mídia individual"""
         if not arquivo or not self.processador_multimodal:
             return self.feedback.erro("Selecione um arquivo e verifique se o sistema multimodal está ativo")
         
-        try:
-            # Detectar tipo de mídia
-            tipo_midia = self.processador_multimodal.detectar_tipo_midia(arquivo.name)
-            
-            if tipo_midia == 'desconhecido':
-                return self.feedback.erro("Tipo de arquivo não suportado")
-            
-            # Extrair texto/análise
-            resultado = self.processador_multimodal.extrair_texto_de_midia(
-                arquivo.name, self.rag_multimodal.cliente_ia
-            )
-            
-            # Formatear resultado
-            return f"""
+        # Detectar tipo de mídia
+        tipo_midia = self.processador_multimodal.detectar_tipo_midia(arquivo.name)
+        
+        if tipo_midia == 'desconhecido':
+            return self.feedback.erro("Tipo de arquivo não suportado")
+        
+        # Extrair texto/análise
+        resultado = self.processador_multimodal.extrair_texto_de_midia(
+            arquivo.name, self.rag_multimodal.cliente_ia
+        )
+        
+        # Formatear resultado
+        return f"""
 # 🎭 Análise de Mídia
 
 **Arquivo:** {Path(arquivo.name).name}  
@@ -619,10 +645,8 @@ class ValidAIEnhancedMultimodal:
 
 {resultado}
 """
-            
-        except Exception as e:
-            return self.feedback.erro(f"Erro na análise: {e}")
     
+    @handler_seguro("Erro ao selecionar corpus", fallback=lambda msg: (FeedbackManager.erro(msg), None))
     def _on_corpus_multimodal_change(self, corpus_id: str) -> Tuple[str, str]:
         """Manipula mudança de corpus multimodal selecionado"""
         if not corpus_id or not self.rag_multimodal:
@@ -631,36 +655,30 @@ class ValidAIEnhancedMultimodal:
                 None
             )
         
-        try:
-            # Verificar se corpus existe
-            if corpus_id not in self.rag_multimodal.corpus_configs:
-                return (
-                    self.feedback.erro(f"Corpus não encontrado: {corpus_id}"),
-                    None
-                )
-            
-            config = self.rag_multimodal.corpus_configs[corpus_id]
-            
-            # Verificar arquivos disponíveis
-            info = self.rag_multimodal.verificar_arquivos_corpus(corpus_id)
-            
-            if info['arquivos_validos'] == 0:
-                return (
-                    self.feedback.aviso(f"{config.nome} selecionado, mas não há arquivos válidos"),
-                    corpus_id
-                )
-            
+        # Verificar se corpus existe
+        if corpus_id not in self.rag_multimodal.corpus_configs:
             return (
-                self.feedback.sucesso(f"{config.nome} selecionado ({info['arquivos_validos']} arquivos, {info['arquivos_imagem']} imagens, {info['arquivos_video']} vídeos)"),
-                corpus_id
+                self.feedback.erro(f"Corpus não encontrado: {corpus_id}"),
+                None
             )
-            
-        except Exception as e:
+        
+        config = self.rag_multimodal.corpus_configs[corpus_id]
+        
+        # Verificar arquivos disponíveis
+        info = self.rag_multimodal.verificar_arquivos_corpus(corpus_id)
+        
+        if info['arquivos_validos'] == 0:
             return (
-                self.feedback.erro(f"Erro ao selecionar corpus: {e}"),
-                None
+                self.feedback.aviso(f"{config.nome} selecionado, mas não há arquivos válidos"),
+                corpus_id
             )
+        
+        return (
+            self.feedback.sucesso(f"{config.nome} selecionado ({info['arquivos_validos']} arquivos, {info['arquivos_imagem']} imagens, {info['arquivos_video']} vídeos)"),
+            corpus_id
+        )
     
+    @handler_seguro("Erro ao atualizar opções", fallback=lambda msg: (gr.Dropdown(choices=[]), FeedbackManager.erro(msg)))
     def _refresh_corpus_multimodal_options(self) -> Tuple[gr.Dropdown, str]:
         """Atualiza opções de corpus multimodais"""
         if not self.rag_multimodal:
@@ -669,18 +687,14 @@ class ValidAIEnhancedMultimodal:
                 self.feedback.erro("Sistema RAG multimodal indisponível")
             )
         
-        try:
-            opcoes = self._obter_opcoes_corpus_multimodal()
-            return (
-                gr.Dropdown(choices=opcoes),
-                self.feedback.sucesso(f"{len(opcoes)} corpus multimodais disponíveis")
-            )
-        except Exception as e:
-            return (
-                gr.Dropdown(choices=[]),
-                self.feedback.erro(f"Erro ao atualizar opções: {e}")
-            )
+        opcoes = self._obter_opcoes_corpus_multimodal()
+        self._opcoes_corpus_multimodal = opcoes
+        return (
+            gr.Dropdown(choices=opcoes),
+            self.feedback.sucesso(f"{len(opcoes)} corpus multimodais disponíveis")
+        )
     
+    @handler_seguro("Erro no processamento", fallback=lambda msg: (FeedbackManager.erro(msg), {}))
     def _process_multimodal_corpus(self, corpus_id: str) -> Tuple[str, Dict]:
         """Processa arquivos multimodais de um corpus"""
         if not corpus_id or not self.rag_multimodal:
@@ -689,22 +703,18 @@ class ValidAIEnhancedMultimodal:
                 {}
             )
         
-        try:
-            # Processar arquivos multimodais
-            estatisticas = self.rag_multimodal.processar_arquivos_multimodais(corpus_id)
-            
-            status_msg = self.feedback.sucesso(
-                f"Processamento concluído: {estatisticas['arquivos_processados']} arquivos processados"
-            )
-            
-            return (status_msg, estatisticas)
-            
-        except Exception as e:
-            return (
-                self.feedback.erro(f"Erro no processamento: {e}"),
-                {}
-            )
+        # Processar arquivos multimodais
+        estatisticas = self.rag_multimodal.processar_arquivos_multimodais(corpus_id)
+        self._cache_rag.clear()
+        self._answer_cache.clear()
+        
+        status_msg = self.feedback.sucesso(
+            f"Processamento concluído: {estatisticas['arquivos_processados']} arquivos processados"
+        )
+        
+        return (status_msg, estatisticas)
     
+    @handler_seguro("Erro na extração", fallback=lambda msg: (FeedbackManager.erro(msg), {}))
     def _extract_texts_from_media(self, corpus_id: str) -> Tuple[str, Dict]:
         """Extrai textos de arquivos de mídia"""
         if not corpus_id or not self.rag_multimodal:
@@ -713,75 +723,84 @@ class ValidAIEnhancedMultimodal:
                 {}
             )
         
-        try:
-            # Processar e extrair textos
-            estatisticas = self.rag_multimodal.processar_arquivos_multimodais(corpus_id)
-            
-            textos_extraidos = len(estatisticas.get('textos_extraidos', []))
-            
-            return (
-                self.feedback.sucesso(f"Textos extraídos de {textos_extraidos} arquivos de mídia"),
-                estatisticas
-            )
-            
-        except Exception as e:
-            return (
-                self.feedback.erro(f"Erro na extração: {e}"),
-                {}
-            )
+        # Processar e extrair textos
+        estatisticas = self.rag_multimodal.processar_arquivos_multimodais(corpus_id)
+        self._cache_rag.clear()
+        self._answer_cache.clear()
+        
+        textos_extraidos = estatisticas.get('total_textos_extraidos', 0)
+        
+        return (
+            self.feedback.sucesso(f"Textos extraídos de {textos_extraidos} arquivos de mídia"),
+            estatisticas
+        )
     
+    @handler_seguro("Erro ao salvar")
     def _save_extracted_texts(self, corpus_id: str, processing_output: Dict) -> str:
         """Salva textos extraídos em arquivo"""
         if not corpus_id or not processing_output:
             return self.feedback.erro("Dados insuficientes para salvar")
         
-        try:
-            arquivo_salvo = self.rag_multimodal.salvar_textos_extraidos(corpus_id, processing_output)
-            return self.feedback.sucesso(f"Textos salvos em: {arquivo_salvo}")
-            
-        except Exception as e:
-            return self.feedback.erro(f"Erro ao salvar: {e}")
+        arquivo_salvo = self.rag_multimodal.salvar_textos_extraidos(corpus_id, processing_output)
+        return self.feedback.sucesso(f"Textos salvos em: {arquivo_salvo}")
     
+    @handler_seguro("Erro ao obter estatísticas", fallback=lambda msg: {"erro": msg})
     def _view_multimodal_stats(self, corpus_id: str) -> Dict:
         """Visualiza estatísticas do corpus multimodal"""
-        if not corpus_id or not self.rag_multimodal:
+        configs = self.rag_multimodal.corpus_configs if self.rag_multimodal else {}
+        if configs.get(corpus_id) is None:
             return {"erro": "Corpus não selecionado"}
         
-        try:
+        chave = f"stats:{corpus_id}"
+        stats = self._cache_rag.get(chave)
+        if stats is None:
             stats = self.rag_multimodal.obter_estatisticas_corpus(corpus_id)
-            return stats
-            
-        except Exception as e:
-            return {"erro": f"Erro ao obter estatísticas: {e}"}
+            self._cache_rag.set(chave, stats)
+        return stats
     
     def _process_multimodal_message(self, message: str, history: List, 
-                                  corpus_id: str, include_visual: bool) -> Tuple[List, str, List]:
-        """Processa mensagem do chat multimodal"""
+                                  corpus_id: str, include_visual: bool) -> Iterator[Tuple[List, str]]:
+        """Processa mensagem do chat multimodal, transmitindo a resposta conforme é gerada"""
+        history = history or []
         if not message.strip():
-            return history, "", history
+            yield history, ""
+            return
         
-        if not corpus_id or not self.rag_multimodal:
+        config = self.rag_multimodal.corpus_configs.get(corpus_id) if self.rag_multimodal else None
+        if config is None:
             error_msg = "⚠️ Selecione um corpus multimodal antes de fazer perguntas"
             history.append([message, error_msg])
-            return history, "", history
+            yield history, ""
+            return
+        
+        # Pergunta repetida: reaproveitar a resposta já gerada
+        chave = f"{corpus_id}:{bool(include_visual)}:{message.strip().lower()}"
+        resposta = self._answer_cache.get(chave)
+        if resposta is not None:
+            history.append([message, resposta])
+            limitar_historico(history, self.config.max_historico_turnos)
+            yield history, ""
+            return
+        
+        # Adicionar cabeçalho informativo
+        history.append([message, f"**🎭 Consultando: {config.nome}** (Multimodal)\n\n"])
+        limitar_historico(history, self.config.max_historico_turnos)
+        yield history, ""
         
         try:
-            # Processar consulta multimodal
-            resposta = self.rag_multimodal.consultar_multimodal(
+            # Processar consulta multimodal por trechos
+            for trecho in self.rag_multimodal.consultar_multimodal_stream(
                 corpus_id, message, include_visual
-            )
-            
-            # Adicionar cabeçalho informativo
-            config = self.rag_multimodal.corpus_configs[corpus_id]
-            cabecalho = f"**🎭 Consultando: {config.nome}** (Multimodal)\n\n"
-            
-            history.append([message, cabecalho + resposta])
-            return history, "", history
+            ):
+                history[-1][1] += trecho
+                yield history, ""
             
         except Exception as e:
-            error_msg = f"❌ Erro na consulta multimodal: {e}"
-            history.append([message, error_msg])
-            return history, "", history
+            history[-1][1] = f"❌ Erro na consulta multimodal: {e}"
+            yield history, ""
+            return
+        
+        self._answer_cache.set(chave, history[-1][1])
     
     def _conectar_eventos_rag_multimodal(self, *components):
         """Conecta eventos da interface RAG multimodal"""
@@ -789,7 +808,7 @@ class ValidAIEnhancedMultimodal:
          process_media_btn, extract_texts_btn, save_extracts_btn, view_stats_btn,
          processing_status, processing_output,
          chatbot_multimodal, msg_multimodal_input, send_multimodal_btn,
-         include_visual_context, clear_multimodal_btn, chat_multimodal_history,
+         include_visual_context, clear_multimodal_btn,
          refresh_multimodal_btn) = components
         
         # Seleção de corpus multimodal
@@ -831,24 +850,20 @@ class ValidAIEnhancedMultimodal:
         )
         
         # Chat multimodal
-        send_multimodal_btn.click(
-            fn=self._process_multimodal_message,
-            inputs=[msg_multimodal_input, chat_multimodal_history, 
-                   corpus_multimodal_state, include_visual_context],
-            outputs=[chatbot_multimodal, msg_multimodal_input, chat_multimodal_history]
-        )
-        
-        msg_multimodal_input.submit(
+        gr.on(
+            triggers=[send_multimodal_btn.click, msg_multimodal_input.submit],
             fn=self._process_multimodal_message,
-            inputs=[msg_multimodal_input, chat_multimodal_history, 
+            inputs=[msg_multimodal_input, chatbot_multimodal, 
                    corpus_multimodal_state, include_visual_context],
-            outputs=[chatbot_multimodal, msg_multimodal_input, chat_multimodal_history]
+            outputs=[chatbot_multimodal, msg_multimodal_input],
+            concurrency_limit=None,
+            queue=True
         )
         
         # Limpar chat
         clear_multimodal_btn.click(
-            fn=lambda: ([], []),
-            outputs=[chatbot_multimodal, chat_multimodal_history]
+            fn=lambda: [],
+            outputs=chatbot_multimodal
         )
     
     def executar(self, share: bool = False, debug: bool = False, porta: Optional[int] = None):
@@ -857,6 +872,13 @@ class ValidAIEnhancedMultimodal:
         
         interface = self.criar_interface_multimodal()
         
+        # Fila com vários workers (o padrão do Gradio processa um evento por vez)
+        interface = interface.queue(
+            default_concurrency_limit=self.config.concurrency_limit,
+            max_size=self.config.tamanho_max_fila,
+            api_open=False
+        )
+        
         launch_params = {
             'show_api': False,
             'allowed_paths': [self.config.historico_dir],
@@ -887,11 +909,14 @@ def main():
     print("\nSistema completo com RAG multimodal! 🎉\n")
     
     try:
-        debug = '--debug' in sys.argv
-        share = '--share' in sys.argv
+        parser = argparse.ArgumentParser(description="🎭 ValidAI Enhanced Multimodal")
+        parser.add_argument('--debug', action='store_true', help='Ativa modo debug')
+        parser.add_argument('--share', action='store_true', help='Cria link público')
+        parser.add_argument('--port', type=int, default=None, help='Porta do servidor')
+        args = parser.parse_args()
         
         app = ValidAIEnhancedMultimodal()
-        app.executar(share=share, debug=debug)
+        app.executar(share=args.share, debug=args.debug, porta=args.port)
         
     except Exception as e:
         logger.error(f"💥 Erro fatal: {e}")
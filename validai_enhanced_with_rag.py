@@ -9,10 +9,17 @@ baseado em Vertex AI nativo, substituindo o RAG original.
 
 import os
 import sys
+import json
+import time
+import uuid
+import argparse
 import warnings
 import logging
+import functools
+import threading
 import gradio as gr
-from typing import Dict, Any, Optional, Tuple, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, List, Iterator, Callable
 from pathlib import Path
 
 # Suprimir warnings
@@ -21,14 +28,27 @@ warnings.filterwarnings("ignore", message="The 'tuples' format for chatbot messa
 # Imports do ValidAI Enhanced original
 from validai_enhanced import (
     ConfigValidAI, GerenciadorConfig, ValidadorArquivos, 
-    FeedbackManager, ValidAIEnhanced
+    FeedbackManager, ValidAIEnhanced, handler_seguro, limitar_historico
 )
+from backend.cache import SmartCache
 
-# Import do novo sistema RAG
-from validai_rag_system import ValidAIRAGManager, ValidAIRAGInterface, criar_configuracao_rag_padrao
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Tempo (s) que o resultado de uma ingestão concluída fica disponível para a sessão que a iniciou
+_INGEST_JOB_TTL = 600
+
+
+def _serializar_json(dados: Any) -> str:
+    """Serializa dados para exibição (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(dados, option=orjson.OPT_INDENT_2, default=str).decode('utf-8')
+    return json.dumps(dados, indent=2, ensure_ascii=False, default=str)
+
 
 class ValidAIEnhancedWithRAG(ValidAIEnhanced):
     """
@@ -38,16 +58,84 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
     baseado em Vertex AI nativo.
     """
     
+    # Blocos estáticos formatados uma única vez em __init__
+    _HEADER_HTML_TEMPLATE = """
+                <div style="text-align: center; padding: 20px;">
+                    <h1>🚀 ValidAI Enhanced + RAG Avançado</h1>
+                    <p style="color: #666;">Sistema Completo de Validação de Modelos ML</p>
+                    <p style="font-size: 0.9em; color: #888;">
+                        Modelo: {modelo_versao} | 
+                        RAG: Vertex AI Nativo | 
+                        Temperatura: {temperatura}
+                    </p>
+                </div>
+                """
+    
+    _RAG_INDISPONIVEL_HTML = """
+                <div style="background: #ffebee; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h4>❌ Sistema RAG Indisponível</h4>
+                    <p>O sistema RAG avançado não pôde ser inicializado. Verifique:</p>
+                    <ul>
+                        <li>Configurações do Google Cloud</li>
+                        <li>Permissões do Vertex AI</li>
+                        <li>Conectividade com a internet</li>
+                    </ul>
+                </div>
+                """
+    
+    _NOVIDADES_RAG_MARKDOWN_TEMPLATE = """
+                ### 🎯 **Sistema RAG Revolucionário**
+                - **Vertex AI Nativo**: Tecnologia de ponta do Google Cloud
+                - **Múltiplos Corpus**: Bases de conhecimento especializadas
+                - **Processamento Inteligente**: Chunking otimizado e embeddings avançados
+                - **Consultas Contextuais**: Respostas baseadas em documentos específicos
+                
+                ### 📚 **Bases de Conhecimento Disponíveis**
+                - **Instruções Normativas**: INs 706, 1253, 1146
+                - **Validações de Mercado**: Relatórios especializados
+                - **Validações de Crédito**: Documentação técnica
+                - **Metodologias**: Frameworks e boas práticas
+                - **Casos de Uso**: Exemplos práticos
+                
+                ### 🔧 **Configuração Atual**
+                - **Projeto**: {project_id}
+                - **Localização**: {location}
+                - **Modelo IA**: {modelo_versao}
+                - **Embedding**: text-embedding-005
+                """
+    
     def __init__(self, arquivo_config: Optional[str] = None):
         """
         Inicializa ValidAI Enhanced com RAG avançado
         
+        O módulo validai_rag_system (e as dependências do Vertex AI que ele
+        carrega) é importado sob demanda em _inicializar_rag_avancado, para
+        não pesar na importação deste módulo.
+        
         Args:
             arquivo_config: Caminho para arquivo de configuração
         """
         # Inicializar ValidAI Enhanced base
         super().__init__(arquivo_config)
         
+        # Pré-renderizar blocos estáticos da interface
+        self._header_html = self._HEADER_HTML_TEMPLATE.format(**self.config.__dict__)
+        self._novidades_rag_markdown = self._NOVIDADES_RAG_MARKDOWN_TEMPLATE.format(**self.config.__dict__)
+        
+        # Cache curto para listagens/estatísticas (evita round-trips repetidos ao Vertex AI)
+        self._cache_rag = SmartCache(max_size=32, default_ttl=30, cleanup_interval=0)
+        
+        # Respostas já geradas por (corpus, pergunta normalizada); limpo ao reprocessar corpus
+        self._answer_cache = SmartCache(max_size=256, default_ttl=None, cleanup_interval=0)
+        
+        # Fila limitada para operações longas de ingestão (upload/criação/processamento)
+        self._ingest_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="validai_ingest")
+        self._ingest_slots = threading.BoundedSemaphore(4)
+        # job_id -> (corpus_id, descrição, future); o job_id fica no gr.State da sessão
+        self._ingest_jobs: Dict[str, Tuple[str, str, Future]] = {}
+        self._ingest_concluidos: Dict[str, float] = {}  # job_id -> instante da conclusão
+        self._ingest_lock = threading.Lock()
+        
         # Inicializar sistema RAG avançado
         self._inicializar_rag_avancado()
         
@@ -55,9 +143,16 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
     
     def _inicializar_rag_avancado(self) -> None:
         """Inicializa o sistema RAG avançado"""
+        self._default_corpus_id = None
+        self._opcoes_corpus: List[Tuple[str, str]] = []
         try:
             logger.info("📚 Inicializando sistema RAG avançado...")
             
+            # Import tardio: carrega Vertex AI/Google Cloud apenas quando o RAG é iniciado
+            from validai_rag_system import (
+                ValidAIRAGManager, ValidAIRAGInterface, criar_configuracao_rag_padrao
+            )
+            
             # Criar configuração RAG baseada na config principal
             config_rag = criar_configuracao_rag_padrao()
             config_rag.update({
@@ -72,6 +167,15 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
             # Criar interface RAG
             self.rag_interface = ValidAIRAGInterface(self.rag_manager)
             
+            # Pré-carregar ferramentas de busca dos corpus já criados
+            self._aquecer_ferramentas_busca()
+            
+            # Opções do seletor calculadas uma vez (atualizadas pelo botão "Atualizar")
+            self._opcoes_corpus = self.rag_interface.obter_opcoes_corpus()
+            
+            # Pré-selecionar o corpus padrão com estatísticas já em cache
+            self._selecionar_corpus_padrao()
+            
             logger.info("✅ Sistema RAG avançado inicializado")
             
         except Exception as e:
@@ -80,6 +184,33 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
             self.rag_manager = None
             self.rag_interface = None
     
+    def _aquecer_ferramentas_busca(self) -> None:
+        """
+        Cria antecipadamente as ferramentas de busca dos corpus já existentes,
+        evitando a resolução no primeiro uso do chat
+        """
+        for info in self.rag_manager.listar_corpus_disponiveis():
+            corpus_id = info['id']
+            if not info.get('corpus_criado') or corpus_id in self.rag_manager.ferramentas_busca:
+                continue
+            try:
+                self.rag_manager.criar_ferramenta_busca(corpus_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Ferramenta de busca não pré-carregada para {corpus_id}: {e}")
+    
+    def _selecionar_corpus_padrao(self) -> None:
+        """Define o primeiro corpus ativo como padrão e pré-calcula suas estatísticas"""
+        self._default_corpus_id = next(
+            (info['id'] for info in self._cached_listar_corpus() if info['ativo']), None
+        )
+        if not self._default_corpus_id:
+            return
+        
+        try:
+            self._cached_stats_json(self._default_corpus_id)
+        except Exception as e:
+            logger.warning(f"⚠️ Estatísticas do corpus padrão indisponíveis: {e}")
+    
     def _criar_aba_rag_avancada(self) -> gr.Column:
         """
         Cria a aba RAG avançada substituindo a original
@@ -98,17 +229,7 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
             
             if not self.rag_manager:
                 # Mostrar erro se RAG não foi inicializado
-                gr.HTML("""
-                <div style="background: #ffebee; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                    <h4>❌ Sistema RAG Indisponível</h4>
-                    <p>O sistema RAG avançado não pôde ser inicializado. Verifique:</p>
-                    <ul>
-                        <li>Configurações do Google Cloud</li>
-                        <li>Permissões do Vertex AI</li>
-                        <li>Conectividade com a internet</li>
-                    </ul>
-                </div>
-                """)
+                gr.HTML(self._RAG_INDISPONIVEL_HTML)
                 return aba_rag
             
             # Painel de controle do RAG
@@ -116,9 +237,10 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
                 with gr.Row():
                     with gr.Column(scale=2):
                         # Seletor de corpus
-                        opcoes_corpus = self.rag_interface.obter_opcoes_corpus()
+                        opcoes_corpus = self._opcoes_corpus
                         corpus_dropdown = gr.Dropdown(
                             choices=opcoes_corpus,
+                            value=self._default_corpus_id,
                             label="📚 Selecionar Base de Conhecimento",
                             info="Escolha a base mais adequada para sua consulta",
                             elem_id="rag_corpus_selector"
@@ -130,8 +252,12 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
                         setup_btn = gr.Button("⚙️ Configurar Corpus", size="sm")
                 
                 # Status do corpus selecionado
+                if self._default_corpus_id:
+                    status_inicial = self.rag_interface.status_corpus(self._default_corpus_id)
+                else:
+                    status_inicial = self.feedback.info("Selecione uma base de conhecimento para começar")
                 corpus_status = gr.HTML(
-                    value=self.feedback.info("Selecione uma base de conhecimento para começar"),
+                    value=status_inicial,
                     elem_id="corpus_status"
                 )
             
@@ -141,9 +267,11 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
                     with gr.Column():
                         gr.Markdown("### 📤 Preparar Corpus")
                         
-                        corpus_info_display = gr.JSON(
+                        corpus_info_display = gr.Code(
                             label="Informações do Corpus",
-                            value={}
+                            language="json",
+                            interactive=False,
+                            value=self._cached_stats_json(self._default_corpus_id) if self._default_corpus_id else "{}"
                         )
                         
                         with gr.Row():
@@ -155,6 +283,11 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
                             value="",
                             elem_id="setup_status"
                         )
+                        
+                        # Acompanhamento das operações de ingestão em segundo plano
+                        # Ativado apenas enquanto a sessão acompanha um job (evita ticks ociosos na fila)
+                        ingest_timer = gr.Timer(2.0, active=False)
+                        ingest_job_state = gr.State(None)
             
             # Interface de chat RAG
             with gr.Row():
@@ -191,17 +324,18 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
                 update_stats_btn = gr.Button("🔄 Atualizar Estatísticas")
             
             # Estados para o RAG
-            corpus_selecionado_state = gr.State(None)
-            chat_history_state = gr.State([])
+            corpus_selecionado_state = gr.State(self._default_corpus_id)
+            # Hash das opções já exibidas nesta sessão (evita reenviar choices inalteradas)
+            corpus_hash_state = gr.State(hash(tuple(opcoes_corpus)))
             
             # Conectar eventos
             self._conectar_eventos_rag(
                 corpus_dropdown, corpus_status, corpus_selecionado_state,
                 config_accordion, corpus_info_display, setup_status,
-                upload_files_btn, create_corpus_btn, process_files_btn,
-                chatbot_rag, msg_input, send_btn, chat_history_state,
+                upload_files_btn, create_corpus_btn, process_files_btn, ingest_timer, ingest_job_state,
+                chatbot_rag, msg_input, send_btn,
                 clear_chat_btn, export_chat_btn, stats_display,
-                refresh_btn, setup_btn, update_stats_btn
+                refresh_btn, setup_btn, update_stats_btn, corpus_hash_state
             )
         
         return aba_rag
@@ -210,10 +344,10 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
         """Conecta todos os eventos da interface RAG"""
         (corpus_dropdown, corpus_status, corpus_selecionado_state,
          config_accordion, corpus_info_display, setup_status,
-         upload_files_btn, create_corpus_btn, process_files_btn,
-         chatbot_rag, msg_input, send_btn, chat_history_state,
+         upload_files_btn, create_corpus_btn, process_files_btn, ingest_timer, ingest_job_state,
+         chatbot_rag, msg_input, send_btn,
          clear_chat_btn, export_chat_btn, stats_display,
-         refresh_btn, setup_btn, update_stats_btn) = components
+         refresh_btn, setup_btn, update_stats_btn, corpus_hash_state) = components
         
         # Seleção de corpus
         corpus_dropdown.change(
@@ -231,45 +365,49 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
         # Atualizar opções
         refresh_btn.click(
             fn=self._refresh_corpus_options,
-            outputs=[corpus_dropdown, stats_display]
+            inputs=[corpus_hash_state],
+            outputs=[corpus_dropdown, stats_display, corpus_hash_state]
         )
         
         # Configuração de corpus
         upload_files_btn.click(
             fn=self._upload_corpus_files,
-            inputs=[corpus_selecionado_state],
-            outputs=[setup_status]
+            inputs=[corpus_selecionado_state, ingest_job_state],
+            outputs=[setup_status, ingest_job_state, ingest_timer]
         )
         
         create_corpus_btn.click(
             fn=self._create_corpus,
-            inputs=[corpus_selecionado_state],
-            outputs=[setup_status]
+            inputs=[corpus_selecionado_state, ingest_job_state],
+            outputs=[setup_status, ingest_job_state, ingest_timer]
         )
         
         process_files_btn.click(
             fn=self._process_corpus_files,
-            inputs=[corpus_selecionado_state],
-            outputs=[setup_status]
+            inputs=[corpus_selecionado_state, ingest_job_state],
+            outputs=[setup_status, ingest_job_state, ingest_timer]
         )
         
-        # Chat
-        send_btn.click(
-            fn=self._process_rag_message,
-            inputs=[msg_input, chat_history_state, corpus_selecionado_state],
-            outputs=[chatbot_rag, msg_input, chat_history_state]
+        ingest_timer.tick(
+            fn=self._status_ingestao,
+            inputs=[ingest_job_state],
+            outputs=[setup_status, ingest_job_state, ingest_timer]
         )
         
-        msg_input.submit(
+        # Chat
+        gr.on(
+            triggers=[send_btn.click, msg_input.submit],
             fn=self._process_rag_message,
-            inputs=[msg_input, chat_history_state, corpus_selecionado_state],
-            outputs=[chatbot_rag, msg_input, chat_history_state]
+            inputs=[msg_input, chatbot_rag, corpus_selecionado_state],
+            outputs=[chatbot_rag, msg_input],
+            concurrency_limit=None,
+            queue=True
         )
         
         # Limpar chat
         clear_chat_btn.click(
-            fn=lambda: ([], []),
-            outputs=[chatbot_rag, chat_history_state]
+            fn=lambda: [],
+            outputs=chatbot_rag
         )
         
         # Atualizar estatísticas
@@ -278,171 +416,297 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
             outputs=stats_display
         )
     
-    def _on_corpus_change(self, corpus_id: str) -> Tuple[str, str, Dict]:
+    @handler_seguro("Erro ao selecionar corpus", fallback=lambda msg: (FeedbackManager.erro(msg), None, "{}"))
+    def _on_corpus_change(self, corpus_id: str) -> Tuple[str, str, str]:
         """Manipula mudança de corpus selecionado"""
         if not corpus_id or not self.rag_interface:
             return (
                 self.feedback.aviso("Nenhum corpus selecionado"),
                 None,
-                {}
+                "{}"
             )
         
-        try:
-            # Selecionar corpus
-            status_msg = self.rag_interface.selecionar_corpus(corpus_id)
-            
-            # Obter informações do corpus
-            info = self.rag_manager.obter_estatisticas_corpus(corpus_id)
-            
-            return status_msg, corpus_id, info
-            
-        except Exception as e:
-            return (
-                self.feedback.erro(f"Erro ao selecionar corpus: {e}"),
-                None,
-                {}
-            )
+        # A seleção fica apenas no gr.State da sessão
+        status_msg = self.rag_interface.status_corpus(corpus_id)
+        
+        # Obter informações do corpus (JSON já serializado)
+        info = self._cached_stats_json(corpus_id)
+        
+        return status_msg, corpus_id, info
     
-    def _refresh_corpus_options(self) -> Tuple[gr.Dropdown, str]:
+    @handler_seguro("Erro ao atualizar", fallback=lambda msg: (gr.Dropdown(choices=[]), FeedbackManager.erro(msg), None))
+    def _refresh_corpus_options(self, ultimo_hash: Optional[int] = None) -> Tuple[gr.Dropdown, str, Optional[int]]:
         """Atualiza opções de corpus disponíveis"""
         if not self.rag_interface:
-            return gr.Dropdown(choices=[]), "❌ Sistema RAG indisponível"
+            return gr.Dropdown(choices=[]), "❌ Sistema RAG indisponível", None
         
-        try:
-            opcoes = self.rag_interface.obter_opcoes_corpus()
-            stats = self._gerar_estatisticas_rag()
-            
-            return (
-                gr.Dropdown(choices=opcoes),
-                stats
-            )
-            
-        except Exception as e:
-            return (
-                gr.Dropdown(choices=[]),
-                f"❌ Erro ao atualizar: {e}"
-            )
+        opcoes = self.rag_interface.obter_opcoes_corpus()
+        self._opcoes_corpus = opcoes
+        stats = self._gerar_estatisticas_rag()
+        
+        # Opções inalteradas: não reenviar o dropdown ao cliente
+        opcoes_hash = hash(tuple(opcoes))
+        if opcoes_hash == ultimo_hash:
+            return gr.update(), stats, ultimo_hash
+        
+        return (
+            gr.Dropdown(choices=opcoes),
+            stats,
+            opcoes_hash
+        )
     
-    def _upload_corpus_files(self, corpus_id: str) -> str:
-        """Faz upload dos arquivos de um corpus"""
+    def _upload_corpus_files(self, corpus_id: str, job_id: Optional[str] = None) -> Tuple[str, Optional[str], Any]:
+        """Enfileira o upload dos arquivos de um corpus"""
         if not corpus_id or not self.rag_manager:
-            return self.feedback.erro("Nenhum corpus selecionado")
+            return self.feedback.erro("Nenhum corpus selecionado"), job_id, gr.update()
         
-        try:
-            enviados, ignorados = self.rag_manager.enviar_arquivos_corpus(corpus_id)
-            
-            if enviados > 0:
-                return self.feedback.sucesso(
-                    f"Upload concluído: {enviados} arquivos enviados, {ignorados} ignorados"
-                )
-            else:
-                return self.feedback.aviso("Nenhum arquivo foi enviado. Verifique o diretório.")
-                
-        except Exception as e:
-            return self.feedback.erro(f"Erro no upload: {e}")
+        return self._enfileirar_ingestao(corpus_id, "Upload de arquivos", self._executar_upload, job_id)
     
-    def _create_corpus(self, corpus_id: str) -> str:
-        """Cria um corpus no Vertex AI"""
+    def _create_corpus(self, corpus_id: str, job_id: Optional[str] = None) -> Tuple[str, Optional[str], Any]:
+        """Enfileira a criação de um corpus no Vertex AI"""
         if not corpus_id or not self.rag_manager:
-            return self.feedback.erro("Nenhum corpus selecionado")
+            return self.feedback.erro("Nenhum corpus selecionado"), job_id, gr.update()
         
-        try:
-            corpus_name = self.rag_manager.criar_corpus_rag(corpus_id)
-            return self.feedback.sucesso(f"Corpus criado: {corpus_name}")
-            
-        except Exception as e:
-            return self.feedback.erro(f"Erro ao criar corpus: {e}")
+        return self._enfileirar_ingestao(corpus_id, "Criação do corpus", self._executar_criacao, job_id)
     
-    def _process_corpus_files(self, corpus_id: str) -> str:
-        """Processa arquivos de um corpus"""
+    def _process_corpus_files(self, corpus_id: str, job_id: Optional[str] = None) -> Tuple[str, Optional[str], Any]:
+        """Enfileira o processamento dos arquivos de um corpus"""
         if not corpus_id or not self.rag_manager:
-            return self.feedback.erro("Nenhum corpus selecionado")
+            return self.feedback.erro("Nenhum corpus selecionado"), job_id, gr.update()
         
-        try:
-            self.rag_manager.processar_arquivos_corpus(corpus_id)
+        return self._enfileirar_ingestao(corpus_id, "Processamento", self._executar_processamento, job_id)
+    
+    def _enfileirar_ingestao(self, corpus_id: str, descricao: str,
+                             tarefa: Callable[[str], str],
+                             job_atual: Optional[str] = None) -> Tuple[str, Optional[str], Any]:
+        """
+        Submete uma operação de ingestão ao executor em segundo plano
+        
+        Args:
+            corpus_id: ID do corpus
+            descricao: Descrição exibida no status
+            tarefa: Função que executa a operação e retorna o HTML de resultado
+            job_atual: Job acompanhado pela sessão (mantido se nada for enfileirado)
             
-            # Criar ferramenta de busca
-            self.rag_manager.criar_ferramenta_busca(corpus_id)
+        Returns:
+            (HTML de status imediato, job_id a acompanhar na sessão,
+            atualização do timer: ativado apenas quando um job é enfileirado)
+        """
+        with self._ingest_lock:
+            self._expirar_jobs_ingestao()
             
+            em_andamento = next(
+                (job for job in self._ingest_jobs.values()
+                 if job[0] == corpus_id and not job[2].done()),
+                None
+            )
+            if em_andamento:
+                return self.feedback.aviso(f"{em_andamento[1]} ainda em andamento para este corpus"), job_atual, gr.update()
+            
+            if not self._ingest_slots.acquire(blocking=False):
+                return self.feedback.aviso("Fila cheia. Aguarde a conclusão das operações em andamento."), job_atual, gr.update()
+            
+            job_id = uuid.uuid4().hex
+            
+            def _executar() -> str:
+                try:
+                    return tarefa(corpus_id)
+                finally:
+                    self._ingest_concluidos[job_id] = time.monotonic()
+                    self._ingest_slots.release()
+            
+            try:
+                self._ingest_jobs[job_id] = (corpus_id, descricao, self._ingest_executor.submit(_executar))
+            except Exception as e:
+                self._ingest_slots.release()
+                return self.feedback.erro(f"Erro ao enfileirar operação: {e}"), job_atual, gr.update()
+        
+        return self.feedback.info(f"{descricao} enfileirado. O status será atualizado automaticamente."), job_id, gr.Timer(active=True)
+    
+    def _status_ingestao(self, job_id: Optional[str]):
+        """
+        Consulta o andamento da operação de ingestão acompanhada pela sessão
+        
+        Ao exibir o resultado de um job concluído, a sessão deixa de acompanhá-lo
+        e o timer é desativado; o job em si só é descartado após _INGEST_JOB_TTL.
+        """
+        job = self._ingest_jobs.get(job_id) if job_id else None
+        if job is None:
+            return gr.update(), None, gr.Timer(active=False)
+        
+        _, descricao, future = job
+        if not future.done():
+            return self.feedback.info(f"{descricao} em andamento..."), job_id, gr.update()
+        
+        return future.result(), None, gr.Timer(active=False)
+    
+    def _expirar_jobs_ingestao(self) -> None:
+        """Remove jobs concluídos há mais de _INGEST_JOB_TTL segundos (chamar com _ingest_lock)"""
+        limite = time.monotonic() - _INGEST_JOB_TTL
+        for job_id, concluido_em in list(self._ingest_concluidos.items()):
+            if concluido_em < limite:
+                self._ingest_jobs.pop(job_id, None)
+                del self._ingest_concluidos[job_id]
+    
+    @handler_seguro("Erro no upload")
+    def _executar_upload(self, corpus_id: str) -> str:
+        """Faz upload dos arquivos de um corpus"""
+        enviados, ignorados = self.rag_manager.enviar_arquivos_corpus(corpus_id)
+        self._invalidar_cache_rag()
+        
+        if enviados > 0:
             return self.feedback.sucesso(
-                "Processamento iniciado! Aguarde alguns minutos para conclusão."
+                f"Upload concluído: {enviados} arquivos enviados, {ignorados} ignorados"
             )
-            
-        except Exception as e:
-            return self.feedback.erro(f"Erro no processamento: {e}")
+        else:
+            return self.feedback.aviso("Nenhum arquivo foi enviado. Verifique o diretório.")
+    
+    @handler_seguro("Erro ao criar corpus")
+    def _executar_criacao(self, corpus_id: str) -> str:
+        """Cria um corpus no Vertex AI"""
+        corpus_name = self.rag_manager.criar_corpus_rag(corpus_id)
+        self._invalidar_cache_rag()
+        return self.feedback.sucesso(f"Corpus criado: {corpus_name}")
     
-    def _process_rag_message(self, message: str, history: List, corpus_id: str) -> Tuple[List, str, List]:
-        """Processa mensagem do chat RAG"""
+    @handler_seguro("Erro no processamento")
+    def _executar_processamento(self, corpus_id: str) -> str:
+        """Processa arquivos de um corpus"""
+        # A ferramenta de busca é criada pelo gerenciador quando a importação termina
+        self.rag_manager.processar_arquivos_corpus(corpus_id)
+        
+        self._invalidar_cache_rag()
+        self._answer_cache.clear()
+        
+        return self.feedback.sucesso(
+            "Processamento iniciado! Aguarde alguns minutos para conclusão."
+        )
+    
+    def _process_rag_message(self, message: str, history: List,
+                             corpus_id: str) -> Iterator[Tuple[List, str]]:
+        """Processa mensagem do chat RAG, transmitindo a resposta conforme é gerada"""
+        history = history or []
         if not message.strip():
-            return history, "", history
+            yield history, ""
+            return
         
         if not corpus_id or not self.rag_interface:
             error_msg = "⚠️ Selecione um corpus antes de fazer perguntas"
             history.append([message, error_msg])
-            return history, "", history
+            yield history, ""
+            return
         
-        try:
-            # Processar consulta
-            resposta = self.rag_interface.processar_consulta(message)
-            
-            # Adicionar ao histórico
+        # Pergunta repetida: reaproveitar a resposta já gerada
+        chave = f"{corpus_id}:{message.strip().lower()}"
+        resposta = self._answer_cache.get(chave)
+        if resposta is not None:
             history.append([message, resposta])
-            
-            return history, "", history
+            limitar_historico(history, self.config.max_historico_turnos)
+            yield history, ""
+            return
+        
+        # Exibir a pergunta imediatamente e preencher a resposta por trechos
+        history.append([message, ""])
+        limitar_historico(history, self.config.max_historico_turnos)
+        yield history, ""
+        
+        # Guardar apenas respostas de corpus já prontos antes da consulta
+        corpus_pronto = corpus_id in self.rag_manager.ferramentas_busca
+        
+        try:
+            for trecho in self.rag_interface.processar_consulta_stream(message, corpus_id):
+                history[-1][1] += trecho
+                yield history, ""
             
         except Exception as e:
-            error_msg = f"❌ Erro na consulta: {e}"
-            history.append([message, error_msg])
-            return history, "", history
+            history[-1][1] = f"❌ Erro na consulta: {e}"
+            yield history, ""
+            return
+        
+        if corpus_pronto:
+            self._answer_cache.set(chave, history[-1][1])
+    
+    def _cached_listar_corpus(self) -> List[Dict[str, Any]]:
+        """Lista os corpus disponíveis reaproveitando o resultado dentro do TTL"""
+        corpus_info = self._cache_rag.get("listar_corpus")
+        if corpus_info is None:
+            corpus_info = self.rag_manager.listar_corpus_disponiveis()
+            self._cache_rag.set("listar_corpus", corpus_info)
+        return corpus_info
+    
+    def _cached_stats_json(self, corpus_id: str) -> str:
+        """
+        Obtém estatísticas de um corpus já serializadas em JSON,
+        reaproveitando o resultado dentro do TTL
+        """
+        chave = f"stats:{corpus_id}"
+        stats_json = self._cache_rag.get(chave)
+        if stats_json is None:
+            stats_json = _serializar_json(self.rag_manager.obter_estatisticas_corpus(corpus_id))
+            self._cache_rag.set(chave, stats_json)
+        return stats_json
     
+    def _invalidar_cache_rag(self) -> None:
+        """Descarta listagens e estatísticas em cache após alterações nos corpus"""
+        self._cache_rag.clear()
+    
+    @handler_seguro("Erro ao gerar estatísticas")
     def _gerar_estatisticas_rag(self) -> str:
         """Gera estatísticas do sistema RAG"""
         if not self.rag_manager:
             return "❌ Sistema RAG indisponível"
         
-        try:
-            corpus_info = self.rag_manager.listar_corpus_disponiveis()
-            
-            html = """
-            <div style="background: #f5f5f5; padding: 15px; border-radius: 8px;">
-                <h4>📊 Status dos Corpus RAG</h4>
-                <table style="width: 100%; border-collapse: collapse;">
-                    <tr style="background: #e0e0e0;">
-                        <th style="padding: 8px; text-align: left;">Corpus</th>
-                        <th style="padding: 8px; text-align: center;">Arquivos</th>
-                        <th style="padding: 8px; text-align: center;">Status</th>
-                    </tr>
-            """
-            
-            for info in corpus_info:
-                status_icon = "✅" if info['corpus_criado'] else "⚠️"
-                arquivos_text = "N/A" if not info['tem_arquivos'] else "Disponível"
-                
-                html += f"""
-                    <tr>
-                        <td style="padding: 8px;">{info['nome']}</td>
-                        <td style="padding: 8px; text-align: center;">{arquivos_text}</td>
-                        <td style="padding: 8px; text-align: center;">{status_icon}</td>
-                    </tr>
-                """
-            
-            html += """
-                </table>
-            </div>
-            """
-            
-            return html
-            
-        except Exception as e:
-            return f"❌ Erro ao gerar estatísticas: {e}"
+        corpus_info = self._cached_listar_corpus()
+        
+        # HTML memoizado pelo conteúdo da listagem
+        chave_html = "html:%d" % hash(tuple(
+            tuple(sorted(info.items())) for info in corpus_info
+        ))
+        html_cache = self._cache_rag.get(chave_html)
+        if html_cache is not None:
+            return html_cache
+        
+        linhas: List[str] = []
+        for info in corpus_info:
+            status_icon = "✅" if info['corpus_criado'] else "⚠️"
+            arquivos_text = "N/A" if not info['tem_arquivos'] else "Disponível"
+            
+            linhas.append(f"""
+                <tr>
+                    <td style="padding: 8px;">{info['nome']}</td>
+                    <td style="padding: 8px; text-align: center;">{arquivos_text}</td>
+                    <td style="padding: 8px; text-align: center;">{status_icon}</td>
+                </tr>
+            """)
+        
+        html = f"""
+        <div style="background: #f5f5f5; padding: 15px; border-radius: 8px;">
+            <h4>📊 Status dos Corpus RAG</h4>
+            <table style="width: 100%; border-collapse: collapse;">
+                <tr style="background: #e0e0e0;">
+                    <th style="padding: 8px; text-align: left;">Corpus</th>
+                    <th style="padding: 8px; text-align: center;">Arquivos</th>
+                    <th style="padding: 8px; text-align: center;">Status</th>
+                </tr>
+                {"".join(linhas)}
+            </table>
+        </div>
+        """
+        
+        self._cache_rag.set(chave_html, html)
+        return html
     
     def criar_interface_aprimorada(self) -> gr.Blocks:
         """
         Cria interface com RAG avançado integrado
         
         Returns:
-            Interface Gradio completa
+            Interface Gradio completa (construída uma única vez por instância)
         """
+        return self._interface
+    
+    @functools.cached_property
+    def _interface(self) -> gr.Blocks:
+        """Constrói a interface com RAG avançado (memoizada)"""
         logger.info("🎨 Criando interface com RAG avançado...")
         
         # Criar chatbots
@@ -472,17 +736,7 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
             
             # Cabeçalho
             with gr.Row():
-                gr.HTML(f"""
-                <div style="text-align: center; padding: 20px;">
-                    <h1>🚀 ValidAI Enhanced + RAG Avançado</h1>
-                    <p style="color: #666;">Sistema Completo de Validação de Modelos ML</p>
-                    <p style="font-size: 0.9em; color: #888;">
-                        Modelo: {self.config.modelo_versao} | 
-                        RAG: Vertex AI Nativo | 
-                        Temperatura: {self.config.temperatura}
-                    </p>
-                </div>
-                """)
+                gr.HTML(self._header_html)
             
             # Estados da aplicação
             lista_abas = gr.State(None)
@@ -521,26 +775,7 @@ class ValidAIEnhancedWithRAG(ValidAIEnhanced):
             """)
             
             with gr.Accordion("🆕 Novidades do RAG Avançado", open=True):
-                gr.Markdown(f"""
-                ### 🎯 **Sistema RAG Revolucionário**
-                - **Vertex AI Nativo**: Tecnologia de ponta do Google Cloud
-                - **Múltiplos Corpus**: Bases de conhecimento especializadas
-                - **Processamento Inteligente**: Chunking otimizado e embeddings avançados
-                - **Consultas Contextuais**: Respostas baseadas em documentos específicos
-                
-                ### 📚 **Bases de Conhecimento Disponíveis**
-                - **Instruções Normativas**: INs 706, 1253, 1146
-                - **Validações de Mercado**: Relatórios especializados
-                - **Validações de Crédito**: Documentação técnica
-                - **Metodologias**: Frameworks e boas práticas
-                - **Casos de Uso**: Exemplos práticos
-                
-                ### 🔧 **Configuração Atual**
-                - **Projeto**: {self.config.project_id}
-                - **Localização**: {self.config.location}
-                - **Modelo IA**: {self.config.modelo_versao}
-                - **Embedding**: text-embedding-005
-                """)
+                gr.Markdown(self._novidades_rag_markdown)
             
             # Incluir informações originais
             with gr.Accordion("📋 Informações Gerais", open=False):
@@ -556,14 +791,17 @@ def main():
     
     try:
         # Verificar argumentos
-        debug = '--debug' in sys.argv
-        share = '--share' in sys.argv
+        parser = argparse.ArgumentParser(description="🚀 ValidAI Enhanced + RAG Avançado")
+        parser.add_argument('--debug', action='store_true', help='Ativa modo debug')
+        parser.add_argument('--share', action='store_true', help='Cria link público')
+        parser.add_argument('--port', type=int, default=None, help='Porta do servidor')
+        args = parser.parse_args()
         
         # Inicializar aplicação
         app = ValidAIEnhancedWithRAG()
         
         # Executar
-        app.executar(share=share, debug=debug)
+        app.executar(share=args.share, debug=args.debug, porta=args.port)
         
     except Exception as e:
         logger.error(f"💥 Erro fatal: {e}")
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔗 ValidAI RAG Comum - Infraestrutura compartilhada dos sistemas RAG
+
+Recursos de processo usados tanto pelo RAG de documentos (validai_rag_system)
+quanto pelo RAG multimodal (validai_rag_multimodal). Não depende dos SDKs do
+Google Cloud, que são importados sob demanda.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Iterator, Optional, Tuple, TypeVar, Union
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Clientes Gemini compartilhados por (projeto, região)
+_clientes_ia: Dict[Tuple[str, str], Any] = {}
+_clientes_ia_lock = threading.Lock()
+
+# Event loop de longa duração onde rodam as chamadas ao cliente `aio` do Gemini.
+# O cliente assíncrono guarda conexões presas ao loop em que foram abertas:
+# um loop por chamada (asyncio.run) deixaria essas conexões órfãs
+# ("Event loop is closed") e não funcionaria dentro de um loop já em execução.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+
+
+def _obter_loop() -> asyncio.AbstractEventLoop:
+    """Retorna o event loop compartilhado, iniciando sua thread no primeiro uso"""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None or _loop.is_closed() or not _loop_thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever,
+                                            name="validai_aio", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def submeter_no_loop(coro: Coroutine[Any, Any, T]) -> Future:
+    """
+    Agenda uma coroutine no event loop compartilhado
+
+    Args:
+        coro: Coroutine a executar
+
+    Returns:
+        concurrent.futures.Future com o resultado
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _obter_loop())
+
+
+def executar_no_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Executa uma coroutine no event loop compartilhado e aguarda o resultado
+
+    Pode ser chamada de qualquer thread, inclusive de dentro de outro event
+    loop (bloqueando-o); de dentro de uma coroutine prefira aguardar_no_loop.
+
+    Raises:
+        RuntimeError: Se chamada a partir da própria thread do loop compartilhado
+    """
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("executar_no_loop chamado dentro do event loop compartilhado")
+    return submeter_no_loop(coro).result()
+
+
+async def aguardar_no_loop(coro: Coroutine[Any, Any, T]) -> T:
+    """Executa uma coroutine no event loop compartilhado a partir de outro loop"""
+    if asyncio.get_running_loop() is _loop:
+        return await coro
+    return await asyncio.wrap_future(submeter_no_loop(coro))
+
+
+def obter_cliente_ia(project_id: str, location: str, max_conexoes: int = 32):
+    """
+    Retorna o cliente Gemini compartilhado do processo para (projeto, região)
+
+    Um único cliente por processo reaproveita o pool de conexões HTTP
+    (keep-alive) entre instâncias e chamadas, evitando novos handshakes TLS.
+    O tamanho do pool é definido pela primeira chamada para cada chave.
+
+    Args:
+        project_id: Projeto do Google Cloud
+        location: Região do Vertex AI
+        max_conexoes: Tamanho do pool de conexões (quando suportado pelo SDK)
+    """
+    chave = (project_id, location)
+    with _clientes_ia_lock:
+        cliente = _clientes_ia.get(chave)
+        if cliente is None:
+            from google import genai
+
+            try:
+                import httpx
+                from google.genai.types import HttpOptions
+
+                limites = httpx.Limits(max_connections=max_conexoes,
+                                       max_keepalive_connections=max_conexoes)
+                http_options = HttpOptions(client_args={'limits': limites},
+                                           async_client_args={'limits': limites})
+                cliente = genai.Client(vertexai=True, project=project_id, location=location,
+                                       http_options=http_options)
+            except (ImportError, TypeError, ValueError) as e:
+                # httpx ausente ou SDK sem client_args: usar o transporte padrão
+                logger.debug(f"Pool HTTP padrão do genai em uso: {e}")
+                cliente = genai.Client(vertexai=True, project=project_id, location=location)
+
+            _clientes_ia[chave] = cliente
+        return cliente
+
+
+def percorrer_diretorio(raiz: Union[str, os.PathLike], *, incluir_diretorios: bool = False,
+                        ignorar_ocultos: bool = False) -> Iterator[os.DirEntry]:
+    """
+    Percorre recursivamente um diretório com os.scandir
+
+    O DirEntry já traz o tipo da entrada, evitando um stat extra por arquivo.
+    Links simbólicos para diretórios não são seguidos, o que evita ciclos
+    (link apontando para um ancestral) e travessias para fora da raiz;
+    links para arquivos são retornados normalmente.
+
+    Args:
+        raiz: Diretório inicial
+        incluir_diretorios: Retorna também os subdiretórios e demais entradas
+            (por padrão, apenas arquivos, inclusive via link simbólico)
+        ignorar_ocultos: Não desce em diretórios ocultos (.git, .venv, ...)
+
+    Yields:
+        Entradas encontradas
+    """
+    with os.scandir(raiz) as entradas:
+        for entrada in entradas:
+            if entrada.is_dir(follow_symlinks=False):
+                if ignorar_ocultos and entrada.name.startswith('.'):
+                    continue
+                if incluir_diretorios:
+                    yield entrada
+                yield from percorrer_diretorio(entrada.path, incluir_diretorios=incluir_diretorios,
+                                               ignorar_ocultos=ignorar_ocultos)
+            elif incluir_diretorios or entrada.is_file():
+                yield entrada
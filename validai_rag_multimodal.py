@@ -7,28 +7,162 @@ Sistema RAG avançado que suporta documentos, imagens, vídeos e outros
 tipos de mídia usando Vertex AI multimodal e Gemini Vision.
 """
 
+from __future__ import annotations
+
+import io
 import os
+import asyncio
 import uuid
 import json
+import re
 import base64
+import copy
+import hashlib
 import logging
+import sqlite3
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Any, Union
-from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Any, Union, Iterator, Mapping
+from dataclasses import dataclass, field, fields, MISSING
 from datetime import datetime
+from functools import lru_cache
 import mimetypes
 
-# Google Cloud imports
-from google import genai
-from google.cloud import storage
-from google.genai.types import GenerateContentConfig, Retrieval, Tool, VertexRagStore, Part
-import vertexai
-from vertexai import rag
+from validai_rag_comum import aguardar_no_loop, executar_no_loop, obter_cliente_ia, percorrer_diretorio
+
+# Google Cloud SDKs são importados sob demanda (ver _inicializar_google_cloud),
+# para que a configuração e o processador possam ser usados sem eles
+if TYPE_CHECKING:
+    from google.genai.types import Tool, Part
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Pillow é opcional: sem ele as imagens são enviadas sem redimensionamento
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 logger = logging.getLogger(__name__)
 
+# Tipos MIME canônicos das extensões suportadas (evita consultar o mimetypes a cada arquivo)
+_MIME_POR_EXTENSAO = {
+    # Imagens
+    '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png', '.gif': 'image/gif',
+    '.bmp': 'image/bmp', '.webp': 'image/webp', '.tiff': 'image/tiff',
+    # Vídeos
+    '.mp4': 'video/mp4', '.avi': 'video/x-msvideo', '.mov': 'video/quicktime',
+    '.wmv': 'video/x-ms-wmv', '.flv': 'video/x-flv', '.webm': 'video/webm', '.mkv': 'video/x-matroska',
+    # Áudio
+    '.mp3': 'audio/mpeg', '.wav': 'audio/wav', '.flac': 'audio/flac', '.aac': 'audio/aac',
+    '.ogg': 'audio/ogg', '.m4a': 'audio/mp4',
+}
+
+
+# Especificação por tipo de mídia: (prefixo MIME, MIME padrão, chave do limite na config, limite padrão em MB)
+_MIDIA_SPECS: Dict[str, Tuple[str, str, Optional[str], int]] = {
+    'imagem': ('image/', 'image/jpeg', None, 20),
+    'video': ('video/', 'video/mp4', 'limite_video_mb', 100),
+    'audio': ('audio/', 'audio/mpeg', 'limite_audio_mb', 50),
+}
+
+_NOME_MIDIA: Dict[str, str] = {'imagem': 'Imagem', 'video': 'Vídeo', 'audio': 'Áudio'}
+
+# Diretório oculto (ignorado na travessia do corpus) com o estado do processamento de cada corpus
+_DIR_ESTADO = ".validai"
+
+# Quantidade de textos extraídos mantidos nas estatísticas como prévia
+_PREVIA_TEXTOS = 3
+
+# Início do texto devolvido quando a extração de uma mídia falha
+_PREFIXO_ERRO_EXTRACAO = "Erro ao processar arquivo de mídia"
+
+# Contador de estatísticas correspondente a cada tipo de mídia
+_CONTADOR_POR_TIPO: Dict[str, str] = {
+    'imagem': 'arquivos_imagem',
+    'video': 'arquivos_video',
+    'audio': 'arquivos_audio',
+}
+
+# Prompts de extração do Gemini Vision (podem ser substituídos via config['prompts'])
+_PROMPT_IMAGEM = """
+Analise esta imagem detalhadamente e forneça:
+
+1. **Descrição geral**: O que você vê na imagem
+2. **Texto visível**: Qualquer texto, números ou dados que aparecem
+3. **Elementos técnicos**: Gráficos, tabelas, diagramas, fórmulas
+4. **Contexto**: Possível relação com validação de modelos, riscos, ou análises financeiras
+5. **Informações relevantes**: Dados, métricas, ou insights importantes
+
+Seja detalhado e preciso, pois esta informação será usada para consultas futuras.
+"""
+
+_PROMPT_VIDEO = """
+Analise este vídeo e forneça:
+
+1. **Resumo do conteúdo**: O que acontece no vídeo
+2. **Texto visível**: Qualquer texto, slides, ou dados mostrados
+3. **Áudio/Narração**: Principais pontos falados (se houver)
+4. **Elementos visuais**: Gráficos, apresentações, demonstrações
+5. **Contexto técnico**: Relação com modelos, validação, ou análises
+6. **Momentos importantes**: Timestamps de informações relevantes
+
+Foque em informações que seriam úteis para consultas sobre validação de modelos.
+"""
+
+_PROMPT_AUDIO = """
+Analise este áudio e forneça:
+
+1. **Transcrição**: Texto falado no áudio (se possível)
+2. **Resumo do conteúdo**: Principais tópicos abordados
+3. **Contexto**: Tipo de apresentação, reunião, ou explicação
+4. **Informações técnicas**: Dados, métricas, ou conceitos mencionados
+5. **Pontos importantes**: Insights relevantes para validação de modelos
+
+Seja preciso na transcrição e identifique informações técnicas importantes.
+"""
 
-@dataclass
+# Extração em lote: cada arquivo é precedido por um marcador e a resposta
+# deve repetir os marcadores para que possa ser separada por arquivo
+_MARCADOR_LOTE = "=== ARQUIVO {numero} ==="
+_RE_MARCADOR_LOTE = re.compile(r"^\s*=== ARQUIVO \d+ ===\s*$", re.MULTILINE)
+
+_PROMPT_LOTE = """Você recebeu {total} arquivos, cada um precedido por uma linha "=== ARQUIVO N ===".
+Responda com uma seção por arquivo, na mesma ordem, iniciando cada seção com a
+mesma linha "=== ARQUIVO N ===" e sem texto fora das seções. Para cada arquivo:
+"""
+
+_PROMPTS_EXTRACAO: Dict[str, str] = {
+    'imagem': _PROMPT_IMAGEM,
+    'video': _PROMPT_VIDEO,
+    'audio': _PROMPT_AUDIO,
+}
+
+
+def _separar_secoes_lote(resposta: Optional[str], total: int) -> Optional[List[str]]:
+    """
+    Separa a resposta de uma extração em lote nas seções de cada arquivo
+    
+    Returns:
+        Uma seção por arquivo, ou None se a resposta não tiver exatamente
+        `total` seções não vazias
+    """
+    secoes = [secao.strip() for secao in _RE_MARCADOR_LOTE.split(resposta or '')[1:]]
+    if len(secoes) != total or not all(secoes):
+        return None
+    return secoes
+
+
+@lru_cache(maxsize=256)
+def _mime_para_extensao(extensao: str) -> Optional[str]:
+    """Resolve o tipo MIME de uma extensão (tabela local, com fallback para mimetypes)"""
+    return _MIME_POR_EXTENSAO.get(extensao) or mimetypes.guess_type(f"arquivo{extensao}")[0]
+
+
+@dataclass(slots=True)
 class MultimodalRAGCorpusConfig:
     """
     🎭 Configuração de um corpus RAG multimodal
@@ -43,6 +177,10 @@ class MultimodalRAGCorpusConfig:
     corpus_id: Optional[str] = None
     suporte_multimodal: bool = True
     
+    # Conjuntos de extensões para consulta O(1) (derivados das listas acima)
+    _exts_arquivo: frozenset = field(init=False, repr=False, compare=False)
+    _exts_multimodal: frozenset = field(init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         """Configurações automáticas após inicialização"""
         if not self.tipos_multimodal:
@@ -54,16 +192,19 @@ class MultimodalRAGCorpusConfig:
                 # Áudio
                 ".mp3", ".wav", ".flac", ".aac", ".ogg", ".m4a"
             ]
+        
+        self._exts_arquivo = frozenset(self.tipos_arquivo)
+        self._exts_multimodal = frozenset(self.tipos_multimodal)
     
     def eh_arquivo_multimodal(self, arquivo_path: str) -> bool:
         """Verifica se o arquivo é multimodal"""
-        extensao = Path(arquivo_path).suffix.lower()
-        return extensao in self.tipos_multimodal
+        extensao = os.path.splitext(arquivo_path)[1].lower()
+        return extensao in self._exts_multimodal
     
     def eh_arquivo_texto(self, arquivo_path: str) -> bool:
         """Verifica se o arquivo é de texto/documento"""
-        extensao = Path(arquivo_path).suffix.lower()
-        return extensao in self.tipos_arquivo
+        extensao = os.path.splitext(arquivo_path)[1].lower()
+        return extensao in self._exts_arquivo
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -86,6 +227,240 @@ class MultimodalRAGCorpusConfig:
         }
 
 
+# Corpus multimodais padrão (argumentos de MultimodalRAGCorpusConfig)
+_CORPUS_PADRAO: Dict[str, Dict[str, Any]] = {
+    'instrucoes_normativas': {
+        'nome': "Instruções Normativas",
+        'descricao': "INs 706, 1253 e 1146 com imagens e diagramas",
+        'diretorio_local': "base_conhecimento/ins",
+        'bucket_path': "validai-rag/ins",
+        'tipos_arquivo': [".pdf", ".txt", ".md"],
+        'suporte_multimodal': True
+    },
+    'apresentacoes_validacao': {
+        'nome': "Apresentações e Vídeos",
+        'descricao': "Apresentações, vídeos explicativos e materiais visuais",
+        'diretorio_local': "base_conhecimento/apresentacoes",
+        'bucket_path': "validai-rag/apresentacoes",
+        'tipos_arquivo': [".pdf", ".pptx", ".txt", ".md"],
+        'suporte_multimodal': True
+    },
+    'graficos_metricas': {
+        'nome': "Gráficos e Métricas",
+        'descricao': "Visualizações, dashboards e gráficos de performance",
+        'diretorio_local': "base_conhecimento/graficos",
+        'bucket_path': "validai-rag/graficos",
+        'tipos_arquivo': [".pdf", ".txt", ".md"],
+        'suporte_multimodal': True
+    },
+    'casos_uso_visuais': {
+        'nome': "Casos de Uso Visuais",
+        'descricao': "Exemplos práticos com imagens, vídeos e demonstrações",
+        'diretorio_local': "base_conhecimento/casos_visuais",
+        'bucket_path': "validai-rag/casos_visuais",
+        'tipos_arquivo': [".pdf", ".txt", ".md", ".ipynb"],
+        'suporte_multimodal': True
+    }
+}
+
+
+def _validar_corpus(dados: Any) -> Optional[str]:
+    """
+    Verifica se um dicionário pode ser usado como argumentos de MultimodalRAGCorpusConfig
+    
+    Returns:
+        Descrição do problema, ou None se a configuração for válida
+    """
+    if not isinstance(dados, dict):
+        return "a configuração deve ser um objeto"
+    
+    campos = {campo.name: campo for campo in fields(MultimodalRAGCorpusConfig) if campo.init}
+    desconhecidos = dados.keys() - campos.keys()
+    if desconhecidos:
+        return f"campos desconhecidos: {', '.join(sorted(desconhecidos))}"
+    
+    faltando = [nome for nome, campo in campos.items()
+                if campo.default is MISSING and campo.default_factory is MISSING and nome not in dados]
+    if faltando:
+        return f"campos obrigatórios ausentes: {', '.join(faltando)}"
+    
+    for nome in ('tipos_arquivo', 'tipos_multimodal'):
+        valor = dados.get(nome, [])
+        if not isinstance(valor, list) or not all(isinstance(ext, str) for ext in valor):
+            return f"'{nome}' deve ser uma lista de extensões"
+    
+    return None
+
+
+def _loads(dados: bytes) -> Any:
+    """Desserializa JSON (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+def _dumps_linha(dados: Any) -> bytes:
+    """Serializa um registro como uma linha JSON (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(dados) + b"\n"
+    return (json.dumps(dados, ensure_ascii=False) + "\n").encode('utf-8')
+
+
+def _gravar_linhas(arquivo, linhas: List[bytes]) -> None:
+    """Grava um lote de linhas e o envia ao disco (executado fora do event loop)"""
+    arquivo.writelines(linhas)
+    arquivo.flush()
+
+
+def _iterar_textos_extraidos(estatisticas: Dict[str, Any]) -> Iterator[Dict[str, str]]:
+    """Itera os textos extraídos a partir do shard JSONL (ou da lista em memória)"""
+    arquivo_textos = estatisticas.get('arquivo_textos')
+    if not arquivo_textos:
+        yield from estatisticas.get('textos_extraidos', [])
+        return
+    
+    with open(arquivo_textos, 'rb') as f:
+        for linha in f:
+            if linha.strip():
+                yield _loads(linha)
+
+
+@lru_cache(maxsize=1)
+def _load_corpus_json(path: str, mtime: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Lê o arquivo de configuração de corpus
+    
+    O mtime faz parte da chave do cache: o arquivo só é relido quando muda.
+    O resultado é compartilhado entre chamadas e não deve ser alterado.
+    """
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+
+def _hash_arquivo(caminho: str) -> bytes:
+    """Hash BLAKE2b (128 bits) do conteúdo do arquivo, lido em blocos de 1MB"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return h.digest()
+
+
+class _LazyCorpusMap(Mapping):
+    """
+    Mapa corpus_id -> MultimodalRAGCorpusConfig instanciado sob demanda
+    
+    Guarda apenas os dicionários de configuração e constrói cada
+    MultimodalRAGCorpusConfig no primeiro acesso.
+    """
+    
+    def __init__(self, dados: Dict[str, Dict[str, Any]]):
+        self._dados = dados
+        self._instancias: Dict[str, MultimodalRAGCorpusConfig] = {}
+    
+    def __getitem__(self, nome: str) -> MultimodalRAGCorpusConfig:
+        config = self._instancias.get(nome)
+        if config is None:
+            try:
+                config = MultimodalRAGCorpusConfig(**self._dados[nome])
+            except TypeError as e:
+                raise ValueError(f"Configuração inválida para o corpus {nome}: {e}")
+            self._instancias[nome] = config
+        return config
+    
+    def __contains__(self, nome: object) -> bool:
+        return nome in self._dados
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._dados)
+    
+    def __len__(self) -> int:
+        return len(self._dados)
+
+
+def _caminho_cache_extracao() -> str:
+    """Caminho padrão do cache de extrações, no diretório de cache do usuário (XDG)"""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'validai', 'extracao_cache.db')
+
+
+class _ExtractionCache:
+    """
+    💾 Cache persistente (SQLite) de textos extraídos de mídias
+    
+    Indexado por (caminho absoluto, mtime_ns, tamanho, assinatura): arquivos
+    inalterados não são reenviados ao Gemini em novas execuções. A assinatura
+    identifica modelo, prompt e pré-processamento usados na extração, de modo
+    que mudar qualquer um deles invalida as entradas antigas. O hash do
+    conteúdo também é guardado, para reaproveitar a extração de cópias da
+    mesma mídia em outros caminhos.
+    
+    O banco só é aberto (e criado) no primeiro acesso.
+    """
+    
+    def __init__(self, caminho_db: str):
+        self.caminho_db = caminho_db
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+    
+    def _conexao(self) -> sqlite3.Connection:
+        """Abre o banco na primeira utilização (chamar com _lock)"""
+        if self._conn is None:
+            diretorio = os.path.dirname(self.caminho_db)
+            if diretorio:
+                os.makedirs(diretorio, exist_ok=True)
+            
+            conn = sqlite3.connect(self.caminho_db, check_same_thread=False)
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS extracoes ("
+                    "path TEXT, mtime INTEGER, size INTEGER, assinatura TEXT, tipo TEXT, texto TEXT, "
+                    "hash BLOB, PRIMARY KEY (path, mtime, size, assinatura))"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS extracoes_hash ON extracoes (hash, assinatura)"
+                )
+            self._conn = conn
+        return self._conn
+    
+    def obter(self, path: str, mtime: int, size: int, assinatura: str) -> Optional[str]:
+        """Retorna o texto em cache para a versão do arquivo, se existir"""
+        with self._lock:
+            linha = self._conexao().execute(
+                "SELECT texto FROM extracoes WHERE path = ? AND mtime = ? AND size = ? AND assinatura = ?",
+                (path, mtime, size, assinatura)
+            ).fetchone()
+        return linha[0] if linha else None
+    
+    def obter_por_hash(self, hash_conteudo: bytes, assinatura: str) -> Optional[Tuple[str, str]]:
+        """Retorna (caminho de origem, texto) de uma extração anterior do mesmo conteúdo"""
+        with self._lock:
+            linha = self._conexao().execute(
+                "SELECT path, texto FROM extracoes WHERE hash = ? AND assinatura = ? LIMIT 1",
+                (hash_conteudo, assinatura)
+            ).fetchone()
+        return (linha[0], linha[1]) if linha else None
+    
+    def salvar(self, path: str, mtime: int, size: int, assinatura: str, tipo: str, texto: str,
+               hash_conteudo: Optional[bytes] = None) -> None:
+        """Armazena o texto extraído para a versão do arquivo"""
+        with self._lock:
+            conn = self._conexao()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extracoes (path, mtime, size, assinatura, tipo, texto, hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (path, mtime, size, assinatura, tipo, texto, hash_conteudo)
+                )
+    
+    def fechar(self) -> None:
+        """Fecha a conexão com o banco (reaberta no próximo acesso)"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
 class ProcessadorMultimodal:
     """
     🎨 Processador de conteúdo multimodal
@@ -102,6 +477,16 @@ class ProcessadorMultimodal:
             'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'],
             'documento': ['.pdf', '.txt', '.md', '.docx', '.doc', '.rtf']
         }
+        
+        # Índice reverso extensão -> tipo de mídia
+        self._ext_to_tipo: Dict[str, str] = {
+            ext: tipo for tipo, extensoes in self.tipos_suportados.items() for ext in extensoes
+        }
+        
+        # Cache de extrações (opcional, ativado por 'extraction_cache_db')
+        caminho_cache = config.get('extraction_cache_db')
+        self._cache_extracao = _ExtractionCache(caminho_cache) if caminho_cache else None
+        self._assinaturas: Dict[str, str] = {}
     
     def detectar_tipo_midia(self, arquivo_path: str) -> str:
         """
@@ -113,119 +498,126 @@ class ProcessadorMultimodal:
         Returns:
             Tipo de mídia ('imagem', 'video', 'audio', 'documento', 'desconhecido')
         """
-        extensao = Path(arquivo_path).suffix.lower()
-        
-        for tipo, extensoes in self.tipos_suportados.items():
-            if extensao in extensoes:
-                return tipo
-        
-        return 'desconhecido'
+        return self._ext_to_tipo.get(os.path.splitext(arquivo_path)[1].lower(), 'desconhecido')
     
-    def processar_imagem(self, arquivo_path: str) -> Part:
+    def _ler_bytes(self, arquivo_path: str, limite_mb: Optional[float] = None,
+                   descricao: str = "Arquivo") -> bytes:
         """
-        Processa arquivo de imagem para o Gemini
+        Lê o conteúdo de um arquivo de mídia
+        
+        O tamanho vem de um único fstat no descritor já aberto: arquivos acima de
+        `limite_mb` são rejeitados sem nenhuma leitura.
         
         Args:
-            arquivo_path: Caminho da imagem
+            arquivo_path: Caminho do arquivo
+            limite_mb: Tamanho máximo aceito em MB (opcional)
+            descricao: Nome do tipo de mídia usado na mensagem de erro
             
         Returns:
-            Part do Gemini com a imagem
-        """
-        try:
-            # Detectar MIME type
-            mime_type, _ = mimetypes.guess_type(arquivo_path)
-            if not mime_type or not mime_type.startswith('image/'):
-                mime_type = 'image/jpeg'  # Fallback
+            Conteúdo do arquivo
             
-            # Ler e codificar imagem
-            with open(arquivo_path, 'rb') as f:
-                image_bytes = f.read()
+        Raises:
+            ValueError: Se o arquivo exceder `limite_mb`
+        """
+        with open(arquivo_path, 'rb') as f:
+            tamanho = os.fstat(f.fileno()).st_size
             
-            # Verificar tamanho (limite de 20MB para Gemini)
-            tamanho_mb = len(image_bytes) / (1024 * 1024)
-            if tamanho_mb > 20:
-                raise ValueError(f"Imagem muito grande: {tamanho_mb:.1f}MB (máximo: 20MB)")
+            if limite_mb is not None and tamanho > limite_mb * 1024 * 1024:
+                raise ValueError(
+                    f"{descricao} muito grande: {tamanho / (1024 * 1024):.1f}MB (máximo: {limite_mb}MB)"
+                )
             
-            # Criar Part
-            return Part.from_bytes(
-                mime_type=mime_type,
-                data=image_bytes
-            )
-            
-        except Exception as e:
-            raise RuntimeError(f"Erro ao processar imagem {arquivo_path}: {e}")
+            return f.read()
     
-    def processar_video(self, arquivo_path: str) -> Part:
+    def _processar_midia(self, arquivo_path: str, *, kind: str) -> Part:
         """
-        Processa arquivo de vídeo para o Gemini
+        Processa arquivo de mídia para o Gemini
         
         Args:
-            arquivo_path: Caminho do vídeo
+            arquivo_path: Caminho do arquivo
+            kind: Tipo de mídia ('imagem', 'video' ou 'audio'), chave de _MIDIA_SPECS
             
         Returns:
-            Part do Gemini com o vídeo
+            Part do Gemini com a mídia
         """
+        from google.genai.types import Part
+        
+        prefixo_mime, mime_padrao, chave_limite, limite_padrao = _MIDIA_SPECS[kind]
+        
         try:
             # Detectar MIME type
-            mime_type, _ = mimetypes.guess_type(arquivo_path)
-            if not mime_type or not mime_type.startswith('video/'):
-                mime_type = 'video/mp4'  # Fallback
-            
-            # Ler vídeo
-            with open(arquivo_path, 'rb') as f:
-                video_bytes = f.read()
+            mime_type = _mime_para_extensao(os.path.splitext(arquivo_path)[1].lower())
+            if not mime_type or not mime_type.startswith(prefixo_mime):
+                mime_type = mime_padrao  # Fallback
             
-            # Verificar tamanho (limite maior para vídeos)
-            tamanho_mb = len(video_bytes) / (1024 * 1024)
-            limite_mb = self.config.get('limite_video_mb', 100)
+            # Limite de tamanho (fixo em 20MB para imagens no Gemini), verificado antes da leitura
+            limite_mb = self.config.get(chave_limite, limite_padrao) if chave_limite else limite_padrao
+            midia_bytes = self._ler_bytes(arquivo_path, limite_mb, _NOME_MIDIA[kind])
             
-            if tamanho_mb > limite_mb:
-                raise ValueError(f"Vídeo muito grande: {tamanho_mb:.1f}MB (máximo: {limite_mb}MB)")
+            if kind == 'imagem' and self.config.get('preprocess_images', True):
+                midia_bytes, mime_type = self._otimizar_imagem(midia_bytes, mime_type)
             
             # Criar Part
             return Part.from_bytes(
                 mime_type=mime_type,
-                data=video_bytes
+                data=midia_bytes
             )
             
         except Exception as e:
-            raise RuntimeError(f"Erro ao processar vídeo {arquivo_path}: {e}")
+            raise RuntimeError(f"Erro ao processar {_NOME_MIDIA[kind].lower()} {arquivo_path}: {e}")
     
-    def processar_audio(self, arquivo_path: str) -> Part:
+    def _otimizar_imagem(self, image_bytes: bytes, mime_type: str) -> Tuple[bytes, str]:
         """
-        Processa arquivo de áudio para o Gemini
+        Reduz a imagem antes do envio ao Gemini
+        
+        Redimensiona para no máximo `image_max_lado` px no maior lado e recodifica
+        como WebP. Mantém o original se o Pillow não estiver disponível, se a
+        imagem for animada, se a conversão falhar ou se o resultado não for menor.
         
         Args:
-            arquivo_path: Caminho do áudio
+            image_bytes: Conteúdo original da imagem
+            mime_type: Tipo MIME original
             
         Returns:
-            Part do Gemini com o áudio
+            Tupla (bytes, tipo MIME) a enviar
         """
+        if Image is None:
+            return image_bytes, mime_type
+        
         try:
-            # Detectar MIME type
-            mime_type, _ = mimetypes.guess_type(arquivo_path)
-            if not mime_type or not mime_type.startswith('audio/'):
-                mime_type = 'audio/mpeg'  # Fallback
-            
-            # Ler áudio
-            with open(arquivo_path, 'rb') as f:
-                audio_bytes = f.read()
-            
-            # Verificar tamanho
-            tamanho_mb = len(audio_bytes) / (1024 * 1024)
-            limite_mb = self.config.get('limite_audio_mb', 50)
-            
-            if tamanho_mb > limite_mb:
-                raise ValueError(f"Áudio muito grande: {tamanho_mb:.1f}MB (máximo: {limite_mb}MB)")
-            
-            # Criar Part
-            return Part.from_bytes(
-                mime_type=mime_type,
-                data=audio_bytes
-            )
-            
+            with Image.open(io.BytesIO(image_bytes)) as imagem:
+                if getattr(imagem, 'is_animated', False):
+                    return image_bytes, mime_type
+                
+                if imagem.mode not in ('RGB', 'RGBA'):
+                    imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() else 'RGB')
+                
+                lado_max = self.config.get('image_max_lado', 2048)
+                imagem.thumbnail((lado_max, lado_max), Image.LANCZOS)
+                
+                saida = io.BytesIO()
+                imagem.save(saida, format='WEBP', quality=self.config.get('image_webp_quality', 85))
         except Exception as e:
-            raise RuntimeError(f"Erro ao processar áudio {arquivo_path}: {e}")
+            logger.debug(f"Imagem enviada sem otimização: {e}")
+            return image_bytes, mime_type
+        
+        otimizada = saida.getvalue()
+        if len(otimizada) >= len(image_bytes):
+            return image_bytes, mime_type
+        
+        return otimizada, 'image/webp'
+    
+    def processar_imagem(self, arquivo_path: str) -> Part:
+        """Processa arquivo de imagem para o Gemini"""
+        return self._processar_midia(arquivo_path, kind='imagem')
+    
+    def processar_video(self, arquivo_path: str) -> Part:
+        """Processa arquivo de vídeo para o Gemini"""
+        return self._processar_midia(arquivo_path, kind='video')
+    
+    def processar_audio(self, arquivo_path: str) -> Part:
+        """Processa arquivo de áudio para o Gemini"""
+        return self._processar_midia(arquivo_path, kind='audio')
     
     def extrair_texto_de_midia(self, arquivo_path: str, cliente_ia) -> str:
         """
@@ -239,102 +631,376 @@ class ProcessadorMultimodal:
             Texto extraído ou descrição da mídia
         """
         tipo_midia = self.detectar_tipo_midia(arquivo_path)
+        if tipo_midia not in ('imagem', 'video', 'audio'):
+            return f"Arquivo de mídia não suportado: {tipo_midia}"
         
+        chave_cache = None
         try:
-            if tipo_midia == 'imagem':
-                return self._extrair_texto_imagem(arquivo_path, cliente_ia)
-            elif tipo_midia == 'video':
-                return self._extrair_texto_video(arquivo_path, cliente_ia)
-            elif tipo_midia == 'audio':
-                return self._extrair_texto_audio(arquivo_path, cliente_ia)
-            else:
-                return f"Arquivo de mídia não suportado: {tipo_midia}"
-                
+            # Reaproveitar extração anterior se o arquivo não mudou
+            chave_cache, texto = self._consultar_cache_extracao(arquivo_path, tipo_midia)
+            if texto is not None:
+                return texto
+            
+            texto = self._extrair_texto(arquivo_path, tipo_midia, cliente_ia)
+            
         except Exception as e:
             logger.error(f"Erro ao extrair texto de {arquivo_path}: {e}")
-            return f"Erro ao processar arquivo de mídia: {Path(arquivo_path).name}"
+            return f"{_PREFIXO_ERRO_EXTRACAO}: {os.path.basename(arquivo_path)}"
+        
+        # Apenas extrações bem-sucedidas vão para o cache
+        if chave_cache is not None:
+            self._cache_extracao.salvar(*chave_cache, tipo_midia, texto)
+        
+        return texto
     
-    def _extrair_texto_imagem(self, arquivo_path: str, cliente_ia) -> str:
-        """Extrai texto de imagem usando Gemini Vision"""
-        try:
-            image_part = self.processar_imagem(arquivo_path)
-            
-            prompt = """
-            Analise esta imagem detalhadamente e forneça:
-            
-            1. **Descrição geral**: O que você vê na imagem
-            2. **Texto visível**: Qualquer texto, números ou dados que aparecem
-            3. **Elementos técnicos**: Gráficos, tabelas, diagramas, fórmulas
-            4. **Contexto**: Possível relação com validação de modelos, riscos, ou análises financeiras
-            5. **Informações relevantes**: Dados, métricas, ou insights importantes
+    async def extrair_texto_de_midia_async(self, arquivo_path: str, cliente_ia,
+                                           semaforo: Optional[asyncio.Semaphore] = None,
+                                           hash_conteudo: Optional[bytes] = None) -> str:
+        """
+        Versão assíncrona de extrair_texto_de_midia (usa o cliente `aio` do Gemini)
+        
+        Leitura do arquivo e cache rodam em threads auxiliares para não bloquear
+        o event loop. Leitura, preparo da mídia e chamada ao Gemini ficam sob o
+        semáforo, limitando também quantas mídias ficam em memória ao mesmo tempo.
+        
+        Args:
+            arquivo_path: Caminho do arquivo
+            cliente_ia: Cliente do Gemini
+            semaforo: Limite de chamadas simultâneas ao Gemini (opcional)
+            hash_conteudo: Hash do conteúdo (opcional); permite reaproveitar a
+                extração em cache de uma cópia da mídia em outro caminho
             
-            Seja detalhado e preciso, pois esta informação será usada para consultas futuras.
-            """
+        Returns:
+            Texto extraído ou descrição da mídia
+        """
+        tipo_midia = self.detectar_tipo_midia(arquivo_path)
+        if tipo_midia not in ('imagem', 'video', 'audio'):
+            return f"Arquivo de mídia não suportado: {tipo_midia}"
+        
+        if semaforo is None:
+            semaforo = asyncio.Semaphore(self.config.get('concurrent_vision_calls', 8))
+        
+        chave_cache = None
+        try:
+            chave_cache, texto = await asyncio.to_thread(self._consultar_cache_extracao, arquivo_path, tipo_midia)
+            if texto is not None:
+                return texto
             
-            resposta = cliente_ia.models.generate_content(
-                model=self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
-                contents=[image_part, prompt]
-            )
+            # Cópia de uma mídia já extraída em outro caminho
+            if chave_cache is not None and hash_conteudo is not None:
+                texto = await asyncio.to_thread(self._consultar_cache_por_hash, arquivo_path,
+                                                tipo_midia, hash_conteudo)
             
-            return f"IMAGEM: {Path(arquivo_path).name}\n\n{resposta.text}"
+            if texto is None:
+                async with semaforo:
+                    conteudo = await asyncio.to_thread(self._preparar_extracao, arquivo_path, tipo_midia)
+                    resposta = await cliente_ia.aio.models.generate_content(
+                        model=self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
+                        contents=conteudo
+                    )
+                texto = self._formatar_extracao(arquivo_path, tipo_midia, resposta.text)
             
         except Exception as e:
-            return f"Erro ao analisar imagem {Path(arquivo_path).name}: {e}"
+            logger.error(f"Erro ao extrair texto de {arquivo_path}: {e}")
+            return f"{_PREFIXO_ERRO_EXTRACAO}: {os.path.basename(arquivo_path)}"
+        
+        if chave_cache is not None:
+            await asyncio.to_thread(self._cache_extracao.salvar, *chave_cache, tipo_midia, texto, hash_conteudo)
+        
+        return texto
     
-    def _extrair_texto_video(self, arquivo_path: str, cliente_ia) -> str:
-        """Extrai informações de vídeo usando Gemini"""
-        try:
-            video_part = self.processar_video(arquivo_path)
+    def extrair_texto_lote(self, paths: List[str], cliente_ia, batch_size: int = 4) -> Dict[str, str]:
+        """
+        Extrai texto de várias mídias pequenas agrupando-as em uma única chamada ao Gemini
+        
+        Imagens e áudios de até `lote_max_mb` são enviados em grupos de `batch_size`
+        do mesmo tipo, com um prompt que pede uma seção delimitada por arquivo.
+        Vídeos, arquivos maiores e grupos cuja resposta não puder ser separada
+        são processados individualmente por extrair_texto_de_midia.
+        
+        Args:
+            paths: Caminhos dos arquivos
+            cliente_ia: Cliente do Gemini
+            batch_size: Número máximo de arquivos por chamada
             
-            prompt = """
-            Analise este vídeo e forneça:
+        Returns:
+            Dicionário caminho -> texto extraído
+        """
+        resultados: Dict[str, str] = {}
+        for tipo_midia, posicoes in self._planejar_lotes(paths, batch_size):
+            lote = [paths[posicao] for posicao in posicoes]
+            textos = self._extrair_lote(lote, tipo_midia, cliente_ia) if len(lote) > 1 else None
+            if textos is None:
+                textos = {arquivo_path: self.extrair_texto_de_midia(arquivo_path, cliente_ia) for arquivo_path in lote}
+            resultados.update(textos)
+        
+        # Devolver na ordem recebida
+        return {arquivo_path: resultados[arquivo_path] for arquivo_path in paths}
+    
+    async def extrair_texto_lote_async(self, paths: List[str], cliente_ia,
+                                       semaforo: Optional[asyncio.Semaphore] = None,
+                                       hashes: Optional[List[Optional[bytes]]] = None) -> List[Union[str, Exception]]:
+        """
+        Versão assíncrona de extrair_texto_lote (usa o cliente `aio` do Gemini)
+        
+        O tamanho dos lotes vem de `lote_tamanho`; cada lote ocupa uma vaga do semáforo.
+        
+        Args:
+            paths: Caminhos dos arquivos
+            cliente_ia: Cliente do Gemini
+            semaforo: Limite de chamadas simultâneas ao Gemini (opcional)
+            hashes: Hash do conteúdo de cada arquivo (opcional, ver extrair_texto_de_midia_async)
             
-            1. **Resumo do conteúdo**: O que acontece no vídeo
-            2. **Texto visível**: Qualquer texto, slides, ou dados mostrados
-            3. **Áudio/Narração**: Principais pontos falados (se houver)
-            4. **Elementos visuais**: Gráficos, apresentações, demonstrações
-            5. **Contexto técnico**: Relação com modelos, validação, ou análises
-            6. **Momentos importantes**: Timestamps de informações relevantes
+        Returns:
+            Textos extraídos, na ordem de `paths` (ver _tarefas_extracao sobre falhas)
+        """
+        if semaforo is None:
+            semaforo = asyncio.Semaphore(self.config.get('concurrent_vision_calls', 8))
+        
+        textos: List[Union[str, Exception]] = [""] * len(paths)
+        for parcial in await asyncio.gather(*await self._tarefas_extracao(paths, cliente_ia, semaforo, hashes)):
+            for posicao, texto in parcial:
+                textos[posicao] = texto
+        return textos
+    
+    async def _tarefas_extracao(self, paths: List[str], cliente_ia, semaforo: asyncio.Semaphore,
+                                hashes: Optional[List[Optional[bytes]]] = None) -> List[Any]:
+        """
+        Planeja a extração de `paths` e retorna uma coroutine por lote ou arquivo individual
+        
+        Cada coroutine resulta em uma lista de (posição em `paths`, texto extraído);
+        uma falha inesperada na extração de um arquivo aparece como a exceção no
+        lugar do texto.
+        """
+        if hashes is None:
+            hashes = [None] * len(paths)
+        
+        planos = await asyncio.to_thread(self._planejar_lotes, paths, self.config.get('lote_tamanho', 4))
+        return [self._extrair_grupo_async(posicoes, tipo_midia, paths, cliente_ia, semaforo, hashes)
+                for tipo_midia, posicoes in planos]
+    
+    async def _extrair_grupo_async(self, posicoes: List[int], tipo_midia: str, paths: List[str],
+                                   cliente_ia, semaforo: asyncio.Semaphore,
+                                   hashes: List[Optional[bytes]]) -> List[Tuple[int, str]]:
+        """Extrai um grupo planejado: em lote quando possível, senão arquivo a arquivo"""
+        textos = None
+        if len(posicoes) > 1:
+            textos = await self._extrair_lote_async([paths[p] for p in posicoes], tipo_midia, cliente_ia,
+                                                    semaforo, [hashes[p] for p in posicoes])
+        
+        if textos is None:
+            individuais = await asyncio.gather(
+                *(self.extrair_texto_de_midia_async(paths[p], cliente_ia, semaforo, hashes[p]) for p in posicoes),
+                return_exceptions=True
+            )
+            return list(zip(posicoes, individuais))
+        
+        return [(p, textos[paths[p]]) for p in posicoes]
+    
+    def _planejar_lotes(self, paths: List[str], batch_size: int) -> List[Tuple[str, List[int]]]:
+        """
+        Agrupa as posições de `paths` para extração
+        
+        Imagens e áudios de até `lote_max_mb` formam grupos de até `batch_size`
+        arquivos do mesmo tipo; os demais arquivos formam grupos de um.
+        
+        Returns:
+            Lista de (tipo de mídia, posições em `paths`)
+        """
+        limite_lote = self.config.get('lote_max_mb', 4) * 1024 * 1024
+        
+        grupos: Dict[str, List[int]] = {}
+        planos: List[Tuple[str, List[int]]] = []
+        for posicao, arquivo_path in enumerate(paths):
+            tipo_midia = self.detectar_tipo_midia(arquivo_path)
+            try:
+                pequeno = os.path.getsize(arquivo_path) <= limite_lote
+            except OSError:
+                pequeno = False
             
-            Foque em informações que seriam úteis para consultas sobre validação de modelos.
-            """
+            if tipo_midia in ('imagem', 'audio') and pequeno and batch_size > 1:
+                grupos.setdefault(tipo_midia, []).append(posicao)
+            else:
+                planos.append((tipo_midia, [posicao]))
+        
+        for tipo_midia, posicoes in grupos.items():
+            for inicio in range(0, len(posicoes), batch_size):
+                planos.append((tipo_midia, posicoes[inicio:inicio + batch_size]))
+        
+        return planos
+    
+    def _extrair_lote(self, lote: List[str], tipo_midia: str, cliente_ia) -> Optional[Dict[str, str]]:
+        """
+        Faz uma única chamada ao Gemini para um lote de mídias do mesmo tipo
+        
+        Returns:
+            Textos por caminho, ou None se a chamada falhar ou a resposta
+            não tiver exatamente uma seção por arquivo
+        """
+        try:
+            textos, pendentes = self._textos_lote_em_cache(lote, tipo_midia)
+            if not pendentes:
+                return textos
             
             resposta = cliente_ia.models.generate_content(
                 model=self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
-                contents=[video_part, prompt]
+                contents=self._preparar_lote(pendentes, tipo_midia)
             )
-            
-            return f"VÍDEO: {Path(arquivo_path).name}\n\n{resposta.text}"
-            
+            return self._concluir_lote(textos, pendentes, tipo_midia, resposta.text)
         except Exception as e:
-            return f"Erro ao analisar vídeo {Path(arquivo_path).name}: {e}"
+            logger.warning(f"⚠️ Extração em lote falhou, processando individualmente: {e}")
+            return None
     
-    def _extrair_texto_audio(self, arquivo_path: str, cliente_ia) -> str:
-        """Extrai texto de áudio usando Gemini"""
+    async def _extrair_lote_async(self, lote: List[str], tipo_midia: str, cliente_ia,
+                                  semaforo: asyncio.Semaphore,
+                                  hashes: List[Optional[bytes]]) -> Optional[Dict[str, str]]:
+        """Versão assíncrona de _extrair_lote (a leitura das mídias fica sob o semáforo)"""
         try:
-            audio_part = self.processar_audio(arquivo_path)
-            
-            prompt = """
-            Analise este áudio e forneça:
+            textos, pendentes = await asyncio.to_thread(self._textos_lote_em_cache, lote, tipo_midia, hashes)
+            if not pendentes:
+                return textos
             
-            1. **Transcrição**: Texto falado no áudio (se possível)
-            2. **Resumo do conteúdo**: Principais tópicos abordados
-            3. **Contexto**: Tipo de apresentação, reunião, ou explicação
-            4. **Informações técnicas**: Dados, métricas, ou conceitos mencionados
-            5. **Pontos importantes**: Insights relevantes para validação de modelos
-            
-            Seja preciso na transcrição e identifique informações técnicas importantes.
-            """
-            
-            resposta = cliente_ia.models.generate_content(
-                model=self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
-                contents=[audio_part, prompt]
-            )
+            async with semaforo:
+                conteudo = await asyncio.to_thread(self._preparar_lote, pendentes, tipo_midia)
+                resposta = await cliente_ia.aio.models.generate_content(
+                    model=self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
+                    contents=conteudo
+                )
+            return await asyncio.to_thread(self._concluir_lote, textos, pendentes, tipo_midia, resposta.text)
+        except Exception as e:
+            logger.warning(f"⚠️ Extração em lote falhou, processando individualmente: {e}")
+            return None
+    
+    def _textos_lote_em_cache(self, lote: List[str], tipo_midia: str,
+                              hashes: Optional[List[Optional[bytes]]] = None
+                              ) -> Tuple[Dict[str, str], List[Tuple[str, Any, Optional[bytes]]]]:
+        """
+        Separa os arquivos de um lote entre já extraídos (cache) e pendentes
+        
+        Returns:
+            (textos por caminho, lista de (caminho, chave de cache, hash) pendentes)
+        """
+        textos: Dict[str, str] = {}
+        pendentes: List[Tuple[str, Any, Optional[bytes]]] = []
+        for posicao, arquivo_path in enumerate(lote):
+            hash_conteudo = hashes[posicao] if hashes else None
+            chave_cache, texto = self._consultar_cache_extracao(arquivo_path, tipo_midia)
             
-            return f"ÁUDIO: {Path(arquivo_path).name}\n\n{resposta.text}"
+            if texto is None and chave_cache is not None and hash_conteudo is not None:
+                texto = self._consultar_cache_por_hash(arquivo_path, tipo_midia, hash_conteudo)
+                if texto is not None:
+                    self._cache_extracao.salvar(*chave_cache, tipo_midia, texto, hash_conteudo)
             
-        except Exception as e:
-            return f"Erro ao analisar áudio {Path(arquivo_path).name}: {e}"
+            if texto is None:
+                pendentes.append((arquivo_path, chave_cache, hash_conteudo))
+            else:
+                textos[arquivo_path] = texto
+        
+        return textos, pendentes
+    
+    def _preparar_lote(self, pendentes: List[Tuple[str, Any, Optional[bytes]]], tipo_midia: str) -> List[Any]:
+        """Monta o conteúdo de uma chamada em lote: marcador + mídia por arquivo, e o prompt"""
+        conteudo: List[Any] = []
+        for numero, (arquivo_path, _, _) in enumerate(pendentes, 1):
+            conteudo.append(_MARCADOR_LOTE.format(numero=numero))
+            conteudo.append(self._processar_midia(arquivo_path, kind=tipo_midia))
+        
+        conteudo.append(_PROMPT_LOTE.format(total=len(pendentes)) + self._prompt_extracao(tipo_midia))
+        return conteudo
+    
+    def _concluir_lote(self, textos: Dict[str, str], pendentes: List[Tuple[str, Any, Optional[bytes]]],
+                       tipo_midia: str, resposta: Optional[str]) -> Optional[Dict[str, str]]:
+        """Separa a resposta do lote por arquivo e grava no cache (None se não houver uma seção por arquivo)"""
+        secoes = _separar_secoes_lote(resposta, len(pendentes))
+        if secoes is None:
+            logger.warning("⚠️ Resposta do lote sem uma seção por arquivo, processando individualmente")
+            return None
+        
+        for (arquivo_path, chave_cache, hash_conteudo), secao in zip(pendentes, secoes):
+            texto = self._formatar_extracao(arquivo_path, tipo_midia, secao)
+            if chave_cache is not None:
+                self._cache_extracao.salvar(*chave_cache, tipo_midia, texto, hash_conteudo)
+            textos[arquivo_path] = texto
+        
+        return textos
+    
+    def _assinatura_extracao(self, tipo_midia: str) -> str:
+        """
+        Identifica as configurações que determinam o texto extraído de um tipo de mídia
+        
+        Combina modelo, prompt e, para imagens, os parâmetros de pré-processamento.
+        """
+        assinatura = self._assinaturas.get(tipo_midia)
+        if assinatura is None:
+            partes = [
+                self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
+                self._prompt_extracao(tipo_midia),
+            ]
+            if tipo_midia == 'imagem':
+                partes += [
+                    self.config.get('preprocess_images', True) and Image is not None,
+                    self.config.get('image_max_lado', 2048),
+                    self.config.get('image_webp_quality', 85),
+                ]
+            serializado = json.dumps(partes, ensure_ascii=False).encode('utf-8')
+            assinatura = hashlib.blake2b(serializado, digest_size=16).hexdigest()
+            self._assinaturas[tipo_midia] = assinatura
+        return assinatura
+    
+    def _consultar_cache_extracao(self, arquivo_path: str,
+                                  tipo_midia: str) -> Tuple[Optional[Tuple[str, int, int, str]], Optional[str]]:
+        """Retorna a chave de cache do arquivo e o texto já extraído (se houver)"""
+        if self._cache_extracao is None:
+            return None, None
+        
+        info = os.stat(arquivo_path)
+        chave_cache = (os.path.abspath(arquivo_path), info.st_mtime_ns, info.st_size,
+                       self._assinatura_extracao(tipo_midia))
+        return chave_cache, self._cache_extracao.obter(*chave_cache)
+    
+    def _consultar_cache_por_hash(self, arquivo_path: str, tipo_midia: str,
+                                  hash_conteudo: bytes) -> Optional[str]:
+        """Texto em cache de outra cópia do mesmo conteúdo, com o nome deste arquivo"""
+        encontrado = self._cache_extracao.obter_por_hash(hash_conteudo, self._assinatura_extracao(tipo_midia))
+        if encontrado is None:
+            return None
+        
+        path_origem, texto = encontrado
+        return texto.replace(os.path.basename(path_origem), os.path.basename(arquivo_path), 1)
+    
+    def _prompt_extracao(self, tipo_midia: str) -> str:
+        """Prompt de extração do tipo de mídia (config['prompts'] ou padrão)"""
+        return self.config.get('prompts', {}).get(tipo_midia, _PROMPTS_EXTRACAO[tipo_midia])
+    
+    def _preparar_extracao(self, arquivo_path: str, tipo_midia: str) -> List[Any]:
+        """Monta o conteúdo (mídia + prompt) enviado ao Gemini para extração"""
+        return [self._processar_midia(arquivo_path, kind=tipo_midia), self._prompt_extracao(tipo_midia)]
+    
+    def _formatar_extracao(self, arquivo_path: str, tipo_midia: str, texto: str) -> str:
+        """Prefixa o texto extraído com o tipo e o nome do arquivo"""
+        rotulo = {'imagem': 'IMAGEM', 'video': 'VÍDEO', 'audio': 'ÁUDIO'}[tipo_midia]
+        return f"{rotulo}: {os.path.basename(arquivo_path)}\n\n{texto}"
+    
+    def _extrair_texto(self, arquivo_path: str, tipo_midia: str, cliente_ia) -> str:
+        """Extrai texto de uma mídia com uma chamada síncrona ao Gemini"""
+        resposta = cliente_ia.models.generate_content(
+            model=self.config.get('modelo_vision', 'gemini-1.5-pro-002'),
+            contents=self._preparar_extracao(arquivo_path, tipo_midia)
+        )
+        
+        return self._formatar_extracao(arquivo_path, tipo_midia, resposta.text)
+    
+    def _extrair_texto_imagem(self, arquivo_path: str, cliente_ia) -> str:
+        """Extrai texto de imagem usando Gemini Vision"""
+        return self._extrair_texto(arquivo_path, 'imagem', cliente_ia)
+    
+    def _extrair_texto_video(self, arquivo_path: str, cliente_ia) -> str:
+        """Extrai informações de vídeo usando Gemini"""
+        return self._extrair_texto(arquivo_path, 'video', cliente_ia)
+    
+    def _extrair_texto_audio(self, arquivo_path: str, cliente_ia) -> str:
+        """Extrai texto de áudio usando Gemini"""
+        return self._extrair_texto(arquivo_path, 'audio', cliente_ia)
 
 
 class ValidAIRAGMultimodal:
@@ -353,9 +1019,10 @@ class ValidAIRAGMultimodal:
             config: Configurações do sistema
         """
         self.config = config
-        self.corpus_configs: Dict[str, MultimodalRAGCorpusConfig] = {}
+        self.corpus_configs: Mapping[str, MultimodalRAGCorpusConfig] = {}
         self.corpus_ativos: Dict[str, Any] = {}
         self.ferramentas_busca: Dict[str, Tool] = {}
+        self._ext_dispatch: Dict[str, Dict[str, str]] = {}
         
         # Inicializar processador multimodal
         self.processador_multimodal = ProcessadorMultimodal(config)
@@ -373,15 +1040,18 @@ class ValidAIRAGMultimodal:
         try:
             logger.info("🔗 Conectando com Google Cloud...")
             
+            import vertexai
+            from google.cloud import storage
+            
             vertexai.init(
                 project=self.config['project_id'],
                 location=self.config['location']
             )
             
-            self.cliente_ia = genai.Client(
-                vertexai=True,
-                project=self.config['project_id'],
-                location=self.config['location']
+            self.cliente_ia = obter_cliente_ia(
+                self.config['project_id'],
+                self.config['location'],
+                self.config.get('http_max_connections', 32)
             )
             
             self.cliente_storage = storage.Client(
@@ -394,72 +1064,83 @@ class ValidAIRAGMultimodal:
             raise RuntimeError(f"❌ Erro na conexão Google Cloud: {e}")
     
     def _carregar_configuracoes_corpus(self) -> None:
-        """Carrega configurações dos corpus multimodais"""
+        """Carrega configurações dos corpus multimodais (instanciadas sob demanda)"""
         logger.info("📋 Carregando configurações de corpus multimodais...")
         
-        # Configurações padrão com suporte multimodal
-        corpus_padrao = {
-            'instrucoes_normativas': MultimodalRAGCorpusConfig(
-                nome="Instruções Normativas",
-                descricao="INs 706, 1253 e 1146 com imagens e diagramas",
-                diretorio_local="base_conhecimento/ins",
-                bucket_path="validai-rag/ins",
-                tipos_arquivo=[".pdf", ".txt", ".md"],
-                suporte_multimodal=True
-            ),
-            'apresentacoes_validacao': MultimodalRAGCorpusConfig(
-                nome="Apresentações e Vídeos",
-                descricao="Apresentações, vídeos explicativos e materiais visuais",
-                diretorio_local="base_conhecimento/apresentacoes",
-                bucket_path="validai-rag/apresentacoes",
-                tipos_arquivo=[".pdf", ".pptx", ".txt", ".md"],
-                suporte_multimodal=True
-            ),
-            'graficos_metricas': MultimodalRAGCorpusConfig(
-                nome="Gráficos e Métricas",
-                descricao="Visualizações, dashboards e gráficos de performance",
-                diretorio_local="base_conhecimento/graficos",
-                bucket_path="validai-rag/graficos",
-                tipos_arquivo=[".pdf", ".txt", ".md"],
-                suporte_multimodal=True
-            ),
-            'casos_uso_visuais': MultimodalRAGCorpusConfig(
-                nome="Casos de Uso Visuais",
-                descricao="Exemplos práticos com imagens, vídeos e demonstrações",
-                diretorio_local="base_conhecimento/casos_visuais",
-                bucket_path="validai-rag/casos_visuais",
-                tipos_arquivo=[".pdf", ".txt", ".md", ".ipynb"],
-                suporte_multimodal=True
-            )
-        }
+        # Configurações padrão com suporte multimodal (cópias: as listas são mutáveis)
+        corpus_brutos = copy.deepcopy(_CORPUS_PADRAO)
         
         # Carregar configurações personalizadas
         config_file = self.config.get('corpus_config_file', 'rag_multimodal_config.json')
         if os.path.exists(config_file):
             try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
+                personalizados = _load_corpus_json(config_file, os.stat(config_file).st_mtime_ns)
+                if not isinstance(personalizados, dict):
+                    raise ValueError("o arquivo deve conter um objeto corpus_id -> configuração")
                 
-                for nome, data in config_data.items():
-                    corpus_padrao[nome] = MultimodalRAGCorpusConfig(**data)
+                # Entradas inválidas são ignoradas aqui, para não falharem durante o uso
+                for corpus_id, dados in personalizados.items():
+                    erro = _validar_corpus(dados)
+                    if erro:
+                        logger.warning(f"⚠️ Corpus {corpus_id} ignorado em {config_file}: {erro}")
+                        continue
+                    corpus_brutos[corpus_id] = copy.deepcopy(dados)
                 
                 logger.info(f"✅ Configurações carregadas de {config_file}")
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao carregar config: {e}")
         
-        self.corpus_configs = corpus_padrao
+        self.corpus_configs = _LazyCorpusMap(corpus_brutos)
         logger.info(f"📋 {len(self.corpus_configs)} corpus multimodais configurados")
     
+    def _obter_ext_dispatch(self, corpus_id: str) -> Dict[str, str]:
+        """
+        Retorna (e memoriza) o mapa extensão -> 'texto' ou tipo de mídia de um corpus
+        
+        Extensões de texto do corpus têm precedência sobre as multimodais.
+        """
+        dispatch = self._ext_dispatch.get(corpus_id)
+        if dispatch is None:
+            config = self.corpus_configs[corpus_id]
+            ext_to_tipo = self.processador_multimodal._ext_to_tipo
+            dispatch = {ext: ext_to_tipo.get(ext, 'desconhecido') for ext in config.tipos_multimodal}
+            dispatch |= {ext: 'texto' for ext in config.tipos_arquivo}
+            self._ext_dispatch[corpus_id] = dispatch
+        return dispatch
+    
     def processar_arquivos_multimodais(self, corpus_id: str) -> Dict[str, Any]:
         """
         Processa arquivos multimodais de um corpus
         
+        Ponto de entrada síncrono; dentro de um event loop use
+        processar_arquivos_multimodais_async.
+        
         Args:
             corpus_id: ID do corpus
             
         Returns:
             Estatísticas do processamento
         """
+        return executar_no_loop(self._processar_arquivos_multimodais(corpus_id))
+    
+    async def processar_arquivos_multimodais_async(self, corpus_id: str) -> Dict[str, Any]:
+        """
+        Processa arquivos multimodais de um corpus com chamadas concorrentes ao Gemini
+        
+        O número de extrações simultâneas é limitado por `concurrent_vision_calls`.
+        As chamadas rodam no event loop compartilhado do cliente `aio`
+        (ver validai_rag_comum), independentemente do loop de quem aguarda.
+        
+        Args:
+            corpus_id: ID do corpus
+            
+        Returns:
+            Estatísticas do processamento
+        """
+        return await aguardar_no_loop(self._processar_arquivos_multimodais(corpus_id))
+    
+    async def _processar_arquivos_multimodais(self, corpus_id: str) -> Dict[str, Any]:
+        """Implementação de processar_arquivos_multimodais (roda no event loop compartilhado)"""
         if corpus_id not in self.corpus_configs:
             raise ValueError(f"Corpus não encontrado: {corpus_id}")
         
@@ -479,49 +1160,119 @@ class ValidAIRAGMultimodal:
             'arquivos_audio': 0,
             'arquivos_processados': 0,
             'erros': 0,
-            'textos_extraidos': []
+            'total_textos_extraidos': 0,
+            'textos_extraidos': [],
+            'arquivo_textos': None
         }
         
-        # Processar todos os arquivos
-        for arquivo in diretorio.rglob('*'):
-            if arquivo.is_file():
-                estatisticas['total_arquivos'] += 1
-                
-                try:
-                    if config.eh_arquivo_texto(str(arquivo)):
-                        # Arquivo de texto normal
-                        estatisticas['arquivos_texto'] += 1
-                        estatisticas['arquivos_processados'] += 1
+        # Classificar arquivos (uma consulta de extensão por arquivo) e separar as mídias
+        dispatch = self._obter_ext_dispatch(corpus_id)
+        tarefas: List[Tuple[os.DirEntry, str]] = []
+        for arquivo in percorrer_diretorio(diretorio, ignorar_ocultos=True):
+            estatisticas['total_arquivos'] += 1
+            
+            tipo = dispatch.get(os.path.splitext(arquivo.name)[1].lower())
+            if tipo is None:
+                continue
+            
+            if tipo == 'texto':
+                # Arquivo de texto normal
+                estatisticas['arquivos_texto'] += 1
+                estatisticas['arquivos_processados'] += 1
+                continue
+            
+            contador = _CONTADOR_POR_TIPO.get(tipo)
+            if contador:
+                estatisticas[contador] += 1
+            
+            tarefas.append((arquivo, tipo))
+        
+        # Deduplicar mídias idênticas pelo conteúdo: só a primeira cópia vai ao Gemini
+        # (entre execuções, o cache de extrações também é consultado pelo hash)
+        hashes = await asyncio.gather(
+            *(asyncio.to_thread(_hash_arquivo, arquivo.path) for arquivo, _ in tarefas),
+            return_exceptions=True
+        )
+        hashes = [h if isinstance(h, bytes) else None for h in hashes]
+        
+        # Primeira ocorrência de cada conteúdo -> índices das cópias idênticas
+        unicas: List[int] = []
+        copias: Dict[int, List[int]] = {}
+        primeira_por_hash: Dict[bytes, int] = {}
+        for indice, h in enumerate(hashes):
+            if h is not None and h in primeira_por_hash:
+                copias[primeira_por_hash[h]].append(indice)
+                continue
+            unicas.append(indice)
+            copias[indice] = []
+            if h is not None:
+                primeira_por_hash[h] = indice
+        
+        # Os textos vão para o shard JSONL à medida que cada extração termina;
+        # as estatísticas guardam só uma prévia e o caminho do shard. O shard
+        # de uma execução anterior é substituído apenas quando este fica completo.
+        lote_gravacao = self.config.get('lote_gravacao_textos', 100)
+        arquivo_textos = diretorio / _DIR_ESTADO / "textos_extraidos.jsonl"
+        arquivo_textos.parent.mkdir(exist_ok=True)
+        arquivo_temp = arquivo_textos.with_suffix('.jsonl.tmp')
+        
+        # Extrair texto das mídias concorrentemente (chamadas ao Gemini são limitadas por I/O);
+        # imagens e áudios pequenos do mesmo tipo são agrupados em uma única chamada
+        semaforo = asyncio.Semaphore(self.config.get('concurrent_vision_calls', 8))
+        grupos = await self.processador_multimodal._tarefas_extracao(
+            [tarefas[i][0].path for i in unicas], self.cliente_ia, semaforo, [hashes[i] for i in unicas]
+        )
+        
+        # A escrita do shard roda em threads, em lotes de lote_gravacao linhas,
+        # para não bloquear o event loop durante as extrações
+        shard = await asyncio.to_thread(open, arquivo_temp, 'wb')
+        try:
+            linhas: List[bytes] = []
+            for proximo in asyncio.as_completed(grupos):
+                for posicao, texto in await proximo:
+                    origem = unicas[posicao]
+                    nome_origem = tarefas[origem][0].name
+                    
+                    for indice in (origem, *copias.pop(origem)):
+                        arquivo, tipo_midia = tarefas[indice]
                         
-                    elif config.eh_arquivo_multimodal(str(arquivo)):
-                        # Arquivo multimodal - extrair texto
-                        tipo_midia = self.processador_multimodal.detectar_tipo_midia(str(arquivo))
+                        if isinstance(texto, Exception):
+                            logger.error(f"❌ Erro ao processar {arquivo.name}: {texto}")
+                            estatisticas['erros'] += 1
+                            continue
                         
-                        if tipo_midia == 'imagem':
-                            estatisticas['arquivos_imagem'] += 1
-                        elif tipo_midia == 'video':
-                            estatisticas['arquivos_video'] += 1
-                        elif tipo_midia == 'audio':
-                            estatisticas['arquivos_audio'] += 1
+                        # Cópia de outra mídia: reaproveitar o texto com o nome deste arquivo
+                        texto_arquivo = texto if indice == origem else texto.replace(nome_origem, arquivo.name, 1)
                         
-                        # Extrair texto da mídia
-                        texto_extraido = self.processador_multimodal.extrair_texto_de_midia(
-                            str(arquivo), self.cliente_ia
-                        )
+                        item = {'arquivo': arquivo.path, 'tipo': tipo_midia, 'texto': texto_arquivo}
+                        linhas.append(_dumps_linha(item))
                         
-                        estatisticas['textos_extraidos'].append({
-                            'arquivo': str(arquivo),
-                            'tipo': tipo_midia,
-                            'texto': texto_extraido
-                        })
+                        estatisticas['total_textos_extraidos'] += 1
+                        if len(estatisticas['textos_extraidos']) < _PREVIA_TEXTOS:
+                            estatisticas['textos_extraidos'].append(item)
                         
                         estatisticas['arquivos_processados'] += 1
-                        
                         logger.info(f"   🎨 Processado {tipo_midia}: {arquivo.name}")
                 
-                except Exception as e:
-                    logger.error(f"❌ Erro ao processar {arquivo.name}: {e}")
-                    estatisticas['erros'] += 1
+                if len(linhas) >= lote_gravacao:
+                    await asyncio.to_thread(_gravar_linhas, shard, linhas)
+                    linhas = []
+            
+            await asyncio.to_thread(_gravar_linhas, shard, linhas)
+            await asyncio.to_thread(shard.close)
+            
+            # Publicar o shard só depois de completo
+            await asyncio.to_thread(os.replace, arquivo_temp, arquivo_textos)
+        except BaseException:
+            # Falha ou cancelamento: não deixar o shard parcial para trás
+            shard.close()
+            try:
+                os.unlink(arquivo_temp)
+            except OSError:
+                pass
+            raise
+        
+        estatisticas['arquivo_textos'] = str(arquivo_textos)
         
         logger.info(f"✅ Processamento concluído: {estatisticas['arquivos_processados']} arquivos")
         return estatisticas
@@ -548,8 +1299,60 @@ class ValidAIRAGMultimodal:
         logger.info(f"🎭 Consulta multimodal em {config.nome}: {pergunta[:50]}...")
         
         try:
-            # Criar prompt contextualizado para multimodal
-            prompt_base = f"""
+            from google.genai.types import GenerateContentConfig
+            
+            resposta = self.cliente_ia.models.generate_content(
+                model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
+                contents=self._montar_prompt_multimodal(config, pergunta, incluir_contexto_visual),
+                config=GenerateContentConfig(tools=[ferramenta]),
+            )
+            
+            return resposta.text
+            
+        except Exception as e:
+            raise RuntimeError(f"❌ Erro na consulta multimodal: {e}")
+    
+    def consultar_multimodal_stream(self, corpus_id: str, pergunta: str,
+                                    incluir_contexto_visual: bool = True) -> Iterator[str]:
+        """
+        Faz consulta multimodal transmitindo a resposta em trechos
+        
+        Args:
+            corpus_id: ID do corpus
+            pergunta: Pergunta do usuário
+            incluir_contexto_visual: Se deve incluir contexto de mídias
+            
+        Yields:
+            Trechos de texto da resposta da IA
+        """
+        if corpus_id not in self.ferramentas_busca:
+            raise ValueError(f"Ferramenta de busca não disponível para: {corpus_id}")
+        
+        ferramenta = self.ferramentas_busca[corpus_id]
+        config = self.corpus_configs[corpus_id]
+        
+        logger.info(f"🎭 Consulta multimodal (stream) em {config.nome}: {pergunta[:50]}...")
+        
+        try:
+            from google.genai.types import GenerateContentConfig
+            
+            stream = self.cliente_ia.models.generate_content_stream(
+                model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
+                contents=self._montar_prompt_multimodal(config, pergunta, incluir_contexto_visual),
+                config=GenerateContentConfig(tools=[ferramenta]),
+            )
+            
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+            
+        except Exception as e:
+            raise RuntimeError(f"❌ Erro na consulta multimodal: {e}")
+    
+    def _montar_prompt_multimodal(self, config: MultimodalRAGCorpusConfig, pergunta: str,
+                                  incluir_contexto_visual: bool) -> str:
+        """Monta o prompt contextualizado para consulta multimodal"""
+        prompt_base = f"""
             Você está consultando a base de conhecimento multimodal: {config.nome}
             Descrição: {config.descricao}
             
@@ -559,30 +1362,24 @@ class ValidAIRAGMultimodal:
             
             Pergunta do usuário: {pergunta}
             """
-            
-            if incluir_contexto_visual:
-                prompt_base += """
+        
+        if incluir_contexto_visual:
+            prompt_base += """
                 
                 IMPORTANTE: Se houver informações visuais relevantes (gráficos, imagens, 
                 vídeos, apresentações), inclua essas informações na sua resposta e 
                 mencione especificamente quando estiver se referindo a conteúdo visual.
                 """
-            
-            resposta = self.cliente_ia.models.generate_content(
-                model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
-                contents=prompt_base,
-                config=GenerateContentConfig(tools=[ferramenta]),
-            )
-            
-            return resposta.text
-            
-        except Exception as e:
-            raise RuntimeError(f"❌ Erro na consulta multimodal: {e}")
+        
+        return prompt_base
     
     def salvar_textos_extraidos(self, corpus_id: str, estatisticas: Dict[str, Any]) -> str:
         """
         Salva textos extraídos de mídias em arquivo para referência
         
+        Os textos são lidos do shard JSONL gerado no processamento
+        (`arquivo_textos`); sem ele, usa a lista `textos_extraidos`.
+        
         Args:
             corpus_id: ID do corpus
             estatisticas: Estatísticas do processamento
@@ -596,7 +1393,7 @@ class ValidAIRAGMultimodal:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         arquivo_saida = Path(config.diretorio_local) / f"textos_extraidos_{timestamp}.md"
         
-        conteudo = f"""# Textos Extraídos - {config.nome}
+        cabecalho = f"""# Textos Extraídos - {config.nome}
 
 Gerado em: {datetime.now().isoformat()}
 Corpus: {corpus_id}
@@ -613,19 +1410,18 @@ Corpus: {corpus_id}
 
 """
         
-        for item in estatisticas['textos_extraidos']:
-            conteudo += f"""
+        # Gravar seção a seção, sem montar o documento inteiro em memória
+        with open(arquivo_saida, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write(cabecalho)
+            for item in _iterar_textos_extraidos(estatisticas):
+                f.write(f"""
 ### {item['arquivo']} ({item['tipo'].upper()})
 
 {item['texto']}
 
 ---
 
-"""
-        
-        # Salvar arquivo
-        with open(arquivo_saida, 'w', encoding='utf-8') as f:
-            f.write(conteudo)
+""")
         
         logger.info(f"💾 Textos extraídos salvos em: {arquivo_saida}")
         return str(arquivo_saida)
@@ -652,6 +1448,15 @@ def criar_configuracao_rag_multimodal() -> Dict[str, Any]:
         'tamanho_max_arquivo_mb': 50,
         'limite_video_mb': 100,
         'limite_audio_mb': 50,
+        'preprocess_images': True,
+        'image_max_lado': 2048,
+        'image_webp_quality': 85,
+        'concurrent_vision_calls': 8,
+        'http_max_connections': 32,
+        'lote_gravacao_textos': 100,
+        'lote_tamanho': 4,
+        'lote_max_mb': 4,
+        'extraction_cache_db': _caminho_cache_extracao(),
         'corpus_config_file': 'rag_multimodal_config.json'
     }
     
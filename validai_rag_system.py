@@ -9,25 +9,189 @@ com tecnologia mais avançada e flexível.
 """
 
 import os
+import copy
 import uuid
+import asyncio
 import json
+import base64
+import hashlib
+import time
 import logging
+import threading
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Any
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Any, Iterator
+from dataclasses import dataclass, field
+from collections import deque
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Google Cloud imports
-from google import genai
 from google.cloud import storage
 from google.genai.types import GenerateContentConfig, Retrieval, Tool, VertexRagStore
 import vertexai
 from vertexai import rag
 
+try:
+    from google.cloud.storage import transfer_manager
+except ImportError:
+    transfer_manager = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from backend.cache import SmartCache
+from validai_rag_comum import executar_no_loop, obter_cliente_ia, percorrer_diretorio
+
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+def _loads(dados: bytes) -> Any:
+    """Desserializa JSON (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+def _dumps(dados: Any) -> bytes:
+    """Serializa JSON indentado em UTF-8 (orjson quando disponível)"""
+    if orjson is not None:
+        return orjson.dumps(dados, option=orjson.OPT_INDENT_2)
+    return json.dumps(dados, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+# Modelos de prompt: só a pergunta (e as respostas, na consolidação) variam por chamada
+_PROMPT_CORPUS_PREFIXO = """
+Você está consultando a base de conhecimento: {nome}
+Descrição: {descricao}
+
+Pergunta do usuário: """
+
+_PROMPT_CORPUS_SUFIXO = """
+
+Por favor, responda baseado exclusivamente no conteúdo desta base de conhecimento.
+Se a informação não estiver disponível, informe claramente.
+"""
+
+_PROMPT_MULTIPLO_PREFIXO = """
+Você recebeu respostas de múltiplas bases de conhecimento para a mesma pergunta:
+{nomes}
+
+Pergunta do usuário: """
+
+_PROMPT_MULTIPLO_RESPOSTAS = """
+
+Respostas por base:
+"""
+
+_PROMPT_MULTIPLO_SUFIXO = """
+
+Por favor:
+1. Consolide as informações de forma coerente
+2. Indique quando informações vêm de bases específicas
+3. Se houver conflitos, mencione as diferentes perspectivas
+"""
+
+
+# Manifesto local (na raiz de cada corpus) dos arquivos já enviados ao bucket
+_MANIFESTO_UPLOAD = ".validai_upload_manifest.json"
+
+# Arquivos acima deste tamanho são enviados em partes (upload resumable)
+_LIMITE_ENVIO_EM_PARTES = 8 * 1024 * 1024
+_TAMANHO_PARTE_UPLOAD = 8 * 1024 * 1024
+
+
+def _enviar_em_partes(blob, arquivo: str, tamanho: int) -> None:
+    """Envia um arquivo grande em partes de tamanho fixo, com retomada por parte"""
+    blob.chunk_size = _TAMANHO_PARTE_UPLOAD
+    with open(arquivo, 'rb') as f:
+        blob.upload_from_file(f, rewind=False, size=tamanho)
+
+
+def _carregar_manifesto(diretorio: Path, destino: str) -> Dict[str, List[int]]:
+    """
+    Lê o manifesto de envio do corpus
+    
+    Retorna vazio se não existir, estiver corrompido ou tiver sido gerado
+    para outro destino (bucket/prefixo).
+    """
+    caminho = diretorio / _MANIFESTO_UPLOAD
+    try:
+        with open(caminho, 'rb') as f:
+            dados = _loads(f.read())
+    except (OSError, ValueError):
+        return {}
+    
+    if not isinstance(dados, dict) or dados.get('destino') != destino:
+        return {}
+    return dados.get('arquivos', {})
+
+
+def _salvar_manifesto(diretorio: Path, destino: str, arquivos: Dict[str, List[int]]) -> None:
+    """Grava o manifesto de envio do corpus de forma atômica"""
+    caminho = diretorio / _MANIFESTO_UPLOAD
+    arquivo_temp = f"{caminho}.tmp"
+    try:
+        with open(arquivo_temp, 'wb') as f:
+            f.write(_dumps({'destino': destino, 'arquivos': arquivos}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(arquivo_temp, caminho)
+    except OSError as e:
+        logger.warning(f"⚠️ Não foi possível salvar o manifesto de envio: {e}")
+
+
+_clientes_storage: Dict[Tuple[str, str], Any] = {}
+_clientes_lock = threading.Lock()
+
+
+def _obter_clientes(project_id: str, location: str, max_conexoes: int = 32) -> Tuple[Any, Any]:
+    """
+    Retorna os clientes (Gemini, Storage) compartilhados do processo para (projeto, região)
+    
+    A inicialização (vertexai.init, descoberta do SDK, token de autenticação)
+    acontece apenas na primeira chamada; novas instâncias reaproveitam os clientes.
+    O cliente Gemini vem do registro comum (validai_rag_comum), o mesmo usado
+    pelo RAG multimodal.
+    """
+    chave = (project_id, location)
+    with _clientes_lock:
+        cliente_storage = _clientes_storage.get(chave)
+        if cliente_storage is None:
+            vertexai.init(project=project_id, location=location)
+            cliente_storage = storage.Client(project=project_id)
+            _clientes_storage[chave] = cliente_storage
+    return obter_cliente_ia(project_id, location, max_conexoes), cliente_storage
+
+
+def _chave_consulta(tipo: str, corpus_ids: List[str], pergunta: str) -> Tuple[str, frozenset, str]:
+    """
+    Chave do cache de respostas: independe da ordem dos corpus e de espaços nas pontas
+
+    O tipo da consulta ('unico' ou 'multi') faz parte da chave, pois os dois
+    modos usam prompts diferentes e não compartilham respostas.
+    """
+    return tipo, frozenset(corpus_ids), pergunta.strip()
+
+
+def _mesmo_conteudo(caminho: str, remoto: Optional[Tuple[int, str]]) -> bool:
+    """Compara um arquivo local com (tamanho, md5 em base64) de um objeto do GCS"""
+    if remoto is None:
+        return False
+    
+    tamanho, md5_remoto = remoto
+    if not md5_remoto or os.path.getsize(caminho) != tamanho:
+        return False
+    
+    h = hashlib.md5()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloco)
+    return base64.b64encode(h.digest()).decode('ascii') == md5_remoto
+
+
+@dataclass(slots=True)
 class RAGCorpusConfig:
     """
     📋 Configuração de um corpus RAG
@@ -40,6 +204,16 @@ class RAGCorpusConfig:
     ativo: bool = True
     corpus_id: Optional[str] = None
     
+    # Campos derivados, calculados uma única vez em __post_init__
+    # (slots=True não permite functools.cached_property)
+    ext_set: frozenset = field(init=False, repr=False, compare=False)
+    diretorio_path: Path = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        """Normaliza as extensões aceitas e o diretório local"""
+        self.ext_set = frozenset(extensao.lower() for extensao in self.tipos_arquivo)
+        self.diretorio_path = Path(self.diretorio_local)
+    
     def to_dict(self) -> Dict[str, Any]:
         """
         Converte a configuração do corpus RAG para dicionário
@@ -58,6 +232,39 @@ class RAGCorpusConfig:
         }
 
 
+# Configurações lidas do arquivo JSON: caminho -> ((mtime_ns, tamanho), configs)
+_configs_arquivo: Dict[str, Tuple[Tuple[int, int], Dict[str, RAGCorpusConfig]]] = {}
+_configs_arquivo_lock = threading.Lock()
+
+
+def _carregar_configs_arquivo(config_file: str) -> Optional[Dict[str, RAGCorpusConfig]]:
+    """
+    Carrega as configurações personalizadas de corpus de um arquivo JSON
+    
+    O arquivo só é lido e validado de novo quando seu mtime ou tamanho
+    mudam; cada chamada recebe cópias próprias dos RAGCorpusConfig, que
+    podem ser alteradas (ex.: corpus_id) sem afetar outras instâncias.
+    
+    Returns:
+        Configurações por nome, ou None se o arquivo não existir
+    """
+    try:
+        info = os.stat(config_file)
+    except FileNotFoundError:
+        return None
+    assinatura = (info.st_mtime_ns, info.st_size)
+    
+    with _configs_arquivo_lock:
+        em_cache = _configs_arquivo.get(config_file)
+        if em_cache is None or em_cache[0] != assinatura:
+            with open(config_file, 'rb') as f:
+                config_data = _loads(f.read())
+            configs = {nome: RAGCorpusConfig(**data) for nome, data in config_data.items()}
+            em_cache = _configs_arquivo[config_file] = (assinatura, configs)
+    
+    return {nome: copy.copy(config) for nome, config in em_cache[1].items()}
+
+
 class ValidAIRAGManager:
     """
     🧠 Gerenciador RAG Avançado para ValidAI
@@ -78,6 +285,32 @@ class ValidAIRAGManager:
         self.corpus_ativos: Dict[str, Any] = {}
         self.ferramentas_busca: Dict[str, Tool] = {}
         
+        # Partes fixas dos prompts, formatadas uma única vez
+        self._prompt_prefixes: Dict[str, str] = {}
+        
+        # Prefixos de consultas múltiplas por conjunto de corpus (ordenado, limitado por LRU)
+        self._multi_prompt_cache = SmartCache(max_size=64, default_ttl=None, cleanup_interval=0)
+        
+        # Resultado recente de verificar_arquivos_corpus por corpus (evita varrer
+        # o diretório a cada renderização da interface)
+        self._file_stats_cache = SmartCache(
+            max_size=64,
+            default_ttl=config.get('stat_cache_ttl_s', 5.0),
+            cleanup_interval=0
+        )
+        
+        # Respostas recentes por (corpus consultados, pergunta); None desativa o cache
+        self._query_cache: Optional[SmartCache] = None
+        if config.get('enable_query_cache', True):
+            self._query_cache = SmartCache(
+                max_size=config.get('query_cache_size', 128),
+                default_ttl=config.get('query_cache_ttl_s', 600),
+                cleanup_interval=0
+            )
+        
+        # Acompanhamento em segundo plano das importações: corpus -> (thread, cancelamento)
+        self._import_jobs: Dict[str, Tuple[threading.Thread, threading.Event]] = {}
+        
         # Inicializar Google Cloud
         self._inicializar_google_cloud()
         
@@ -91,25 +324,43 @@ class ValidAIRAGManager:
         try:
             logger.info("🔗 Conectando com Google Cloud...")
             
-            vertexai.init(
-                project=self.config['project_id'],
-                location=self.config['location']
-            )
-            
-            self.cliente_ia = genai.Client(
-                vertexai=True,
-                project=self.config['project_id'],
-                location=self.config['location']
-            )
-            
-            self.cliente_storage = storage.Client(
-                project=self.config['project_id']
+            self.cliente_ia, self.cliente_storage = _obter_clientes(
+                self.config['project_id'],
+                self.config['location'],
+                self.config.get('http_max_connections', 32)
             )
             
             logger.info("✅ Conectado ao Google Cloud")
             
         except Exception as e:
             raise RuntimeError(f"❌ Erro na conexão Google Cloud: {e}")
+        
+        if self.config.get('warmup_on_init', True):
+            threading.Thread(
+                target=self._aquecer_clientes, name="validai-rag-warmup", daemon=True
+            ).start()
+    
+    def _aquecer_clientes(self) -> None:
+        """
+        Faz uma chamada leve em cada serviço para antecipar autenticação e conexões
+        
+        Executado em thread daemon na inicialização, para que a primeira consulta
+        do usuário não pague o custo de token, descoberta e handshake TLS.
+        """
+        aquecimentos = (
+            ("Storage", lambda: self.cliente_storage.get_bucket(self.config['bucket_name'])),
+            # count_tokens percorre o mesmo caminho de autenticação sem gerar cobrança
+            ("Gemini", lambda: self.cliente_ia.models.count_tokens(
+                model=self.config['modelo_ia'], contents="ping"
+            )),
+            ("RAG", lambda: next(iter(rag.list_corpora()), None)),
+        )
+        for servico, chamada in aquecimentos:
+            try:
+                chamada()
+            except Exception as e:
+                logger.debug(f"Aquecimento {servico} ignorado: {e}")
+        logger.debug("🔥 Clientes Google Cloud aquecidos")
     
     def _carregar_configuracoes_corpus(self) -> None:
         """Carrega configurações dos corpus disponíveis"""
@@ -156,17 +407,13 @@ class ValidAIRAGManager:
         
         # Carregar configurações personalizadas se existirem
         config_file = self.config.get('corpus_config_file', 'rag_corpus_config.json')
-        if os.path.exists(config_file):
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config_data = json.load(f)
-                
-                for nome, data in config_data.items():
-                    corpus_padrao[nome] = RAGCorpusConfig(**data)
-                
+        try:
+            configs_arquivo = _carregar_configs_arquivo(config_file)
+            if configs_arquivo is not None:
+                corpus_padrao.update(configs_arquivo)
                 logger.info(f"✅ Configurações carregadas de {config_file}")
-            except Exception as e:
-                logger.warning(f"⚠️ Erro ao carregar config: {e}")
+        except Exception as e:
+            logger.warning(f"⚠️ Erro ao carregar config: {e}")
         
         self.corpus_configs = corpus_padrao
         logger.info(f"📋 {len(self.corpus_configs)} corpus configurados")
@@ -197,6 +444,9 @@ class ValidAIRAGManager:
         """
         Verifica arquivos disponíveis para um corpus
         
+        O resultado é reaproveitado por `stat_cache_ttl_s` segundos e descartado
+        quando arquivos são enviados ou o corpus é limpo.
+        
         Args:
             corpus_id: ID do corpus
             
@@ -206,8 +456,17 @@ class ValidAIRAGManager:
         if corpus_id not in self.corpus_configs:
             raise ValueError(f"Corpus não encontrado: {corpus_id}")
         
+        info = self._file_stats_cache.get(corpus_id)
+        if info is None:
+            info = self._varrer_arquivos_corpus(corpus_id)
+            self._file_stats_cache.set(corpus_id, info)
+        
+        return dict(info)
+    
+    def _varrer_arquivos_corpus(self, corpus_id: str) -> Dict[str, Any]:
+        """Percorre o diretório do corpus coletando as informações de arquivos"""
         config = self.corpus_configs[corpus_id]
-        diretorio = Path(config.diretorio_local)
+        diretorio = config.diretorio_path
         
         if not diretorio.exists():
             return {
@@ -218,33 +477,43 @@ class ValidAIRAGManager:
                 'status': 'diretorio_nao_existe'
             }
         
-        arquivos_validos = []
+        total_arquivos = 0
+        arquivos_validos = 0
+        previa: List[str] = []  # Primeiros 10 para preview
         tamanho_total = 0
         tipos_encontrados = set()
         
-        for arquivo in diretorio.rglob('*'):
-            if arquivo.is_file():
-                extensao = arquivo.suffix.lower()
-                if extensao in config.tipos_arquivo:
-                    arquivos_validos.append(str(arquivo))
-                    tamanho_total += arquivo.stat().st_size
+        # Uma única travessia do diretório (a contagem total inclui subdiretórios)
+        for entrada in percorrer_diretorio(diretorio, incluir_diretorios=True):
+            total_arquivos += 1
+            if entrada.is_file():
+                extensao = os.path.splitext(entrada.name)[1].lower()
+                if extensao in config.ext_set:
+                    arquivos_validos += 1
+                    if len(previa) < 10:
+                        previa.append(entrada.path)
+                    tamanho_total += entrada.stat().st_size
                     tipos_encontrados.add(extensao)
         
         return {
-            'total_arquivos': len(list(diretorio.rglob('*'))),
-            'arquivos_validos': len(arquivos_validos),
+            'total_arquivos': total_arquivos,
+            'arquivos_validos': arquivos_validos,
             'tamanho_total_mb': tamanho_total / (1024 * 1024),
             'tipos_encontrados': list(tipos_encontrados),
-            'arquivos': arquivos_validos[:10],  # Primeiros 10 para preview
+            'arquivos': previa,
             'status': 'ok' if arquivos_validos else 'sem_arquivos_validos'
         }
     
-    def enviar_arquivos_corpus(self, corpus_id: str) -> Tuple[int, int]:
+    def enviar_arquivos_corpus(self, corpus_id: str, forcar: bool = False) -> Tuple[int, int]:
         """
         Envia arquivos de um corpus para o Google Cloud Storage
         
+        Arquivos cujo tamanho e mtime não mudaram desde o último envio
+        (registrados no manifesto local do corpus) são ignorados.
+        
         Args:
             corpus_id: ID do corpus
+            forcar: Ignora o manifesto e reavalia todos os arquivos
             
         Returns:
             (arquivos_enviados, arquivos_ignorados)
@@ -263,7 +532,7 @@ class ValidAIRAGManager:
             raise RuntimeError(f"❌ Erro ao acessar bucket {bucket_name}: {e}")
         
         # Processar arquivos
-        diretorio = Path(config.diretorio_local)
+        diretorio = config.diretorio_path
         if not diretorio.exists():
             raise ValueError(f"Diretório não existe: {diretorio}")
         
@@ -271,41 +540,187 @@ class ValidAIRAGManager:
         ignorados = 0
         tamanho_max_mb = self.config.get('tamanho_max_arquivo_mb', 50)
         
-        for arquivo in diretorio.rglob('*'):
-            if arquivo.is_file():
-                extensao = arquivo.suffix.lower()
+        # Manifesto do último envio: caminho relativo -> [tamanho, mtime_ns]
+        destino = f"{bucket_name}/{config.bucket_path}"
+        manifesto = {} if forcar else _carregar_manifesto(diretorio, destino)
+        assinaturas: Dict[str, List[int]] = {}
+        sem_mudancas = 0
+        
+        # Os caminhos do scandir começam com "<diretorio><sep>": o relativo é um fatiamento
+        inicio_relativo = len(str(diretorio)) + 1
+        
+        # Selecionar arquivos a enviar
+        pendentes: List[Tuple[str, str, int]] = []  # (arquivo, caminho relativo, tamanho)
+        for entrada in percorrer_diretorio(diretorio, incluir_diretorios=True):
+            if entrada.is_file():
+                if entrada.name == _MANIFESTO_UPLOAD:
+                    continue
                 
-                if extensao not in config.tipos_arquivo:
+                extensao = os.path.splitext(entrada.name)[1].lower()
+                
+                if extensao not in config.ext_set:
                     ignorados += 1
                     continue
                 
                 # Verificar tamanho
-                tamanho_mb = arquivo.stat().st_size / (1024 * 1024)
+                info = entrada.stat()
+                tamanho_mb = info.st_size / (1024 * 1024)
                 if tamanho_mb > tamanho_max_mb:
-                    logger.warning(f"⏭️ Arquivo muito grande: {arquivo.name} ({tamanho_mb:.1f}MB)")
+                    logger.warning(f"⏭️ Arquivo muito grande: {entrada.name} ({tamanho_mb:.1f}MB)")
                     ignorados += 1
                     continue
                 
-                try:
-                    # Criar caminho no bucket
-                    caminho_relativo = arquivo.relative_to(diretorio)
-                    nome_no_bucket = f"{config.bucket_path}/{caminho_relativo}".replace("\\", "/")
-                    
-                    # Enviar arquivo
-                    blob = bucket.blob(nome_no_bucket)
-                    blob.upload_from_filename(str(arquivo))
-                    enviados += 1
-                    
-                    if enviados % 10 == 0:
-                        logger.info(f"📤 Enviados {enviados} arquivos...")
+                # Caminho relativo (com "/") que compõe o nome no bucket
+                relativo = entrada.path[inicio_relativo:]
+                if os.sep != "/":
+                    relativo = relativo.replace(os.sep, "/")
+                assinatura = [info.st_size, info.st_mtime_ns]
+                assinaturas[relativo] = assinatura
                 
-                except Exception as e:
-                    logger.error(f"❌ Erro ao enviar {arquivo.name}: {e}")
+                if manifesto.get(relativo) == assinatura:
+                    sem_mudancas += 1
+                    continue
+                
+                pendentes.append((entrada.path, relativo, info.st_size))
+        
+        if sem_mudancas:
+            logger.info(f"⏭️ {sem_mudancas} arquivos inalterados desde o último envio")
+            ignorados += sem_mudancas
+        
+        # Não reenviar arquivos idênticos aos que já estão no bucket
+        sincronizados: List[str] = []
+        if pendentes:
+            existentes = self._existing_blobs(bucket_name, config)
+            a_enviar = []
+            for pendente in pendentes:
+                arquivo, relativo, _ = pendente
+                if _mesmo_conteudo(arquivo, existentes.get(f"{config.bucket_path}/{relativo}")):
+                    sincronizados.append(relativo)
+                else:
+                    a_enviar.append(pendente)
+            
+            if sincronizados:
+                logger.info(f"⏭️ {len(sincronizados)} arquivos já estão no bucket sem alterações")
+                ignorados += len(sincronizados)
+            pendentes = a_enviar
+        
+        # Enviar em paralelo (uploads são limitados pela latência de rede)
+        if pendentes:
+            resultados = self._enviar_blobs(bucket, diretorio, config.bucket_path, pendentes)
+            for (arquivo, relativo, _), erro in zip(pendentes, resultados):
+                if isinstance(erro, Exception):
+                    logger.error(f"❌ Erro ao enviar {os.path.basename(arquivo)}: {erro}")
                     ignorados += 1
+                else:
+                    sincronizados.append(relativo)
+                    enviados += 1
+        
+        # Registrar no manifesto o que está sincronizado com o bucket
+        if sincronizados:
+            for relativo in sincronizados:
+                manifesto[relativo] = assinaturas[relativo]
+            _salvar_manifesto(diretorio, destino, manifesto)
         
+        self._file_stats_cache.delete(corpus_id)
         logger.info(f"✅ Corpus {config.nome}: {enviados} enviados, {ignorados} ignorados")
         return enviados, ignorados
     
+    def _existing_blobs(self, bucket_name: str, config: RAGCorpusConfig) -> Dict[str, Tuple[int, str]]:
+        """
+        Lista os objetos já enviados para o corpus
+        
+        O filtro por prefixo é feito no servidor (match_glob) e apenas os
+        campos necessários são retornados em cada página.
+        
+        Args:
+            bucket_name: Nome do bucket
+            config: Configuração do corpus
+            
+        Returns:
+            Dicionário nome do objeto -> (tamanho, md5 em base64)
+        """
+        try:
+            blobs = self.cliente_storage.list_blobs(
+                bucket_name,
+                match_glob=f"{config.bucket_path}/**",
+                fields="items(name,size,md5Hash),nextPageToken",
+                page_size=1000,
+            )
+            return {blob.name: (blob.size, blob.md5_hash) for blob in blobs}
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível listar objetos existentes: {e}")
+            return {}
+    
+    def _enviar_blobs(self, bucket, diretorio: Path, prefixo: str,
+                      pendentes: List[Tuple[str, str, int]]) -> List[Optional[Exception]]:
+        """
+        Envia arquivos ao bucket em paralelo
+        
+        Arquivos pequenos vão em envio único pelo transfer_manager do
+        google-cloud-storage (sessões reaproveitadas entre os workers) ou, se
+        indisponível, por um pool de threads próprio. Arquivos acima de
+        _LIMITE_ENVIO_EM_PARTES são enviados em partes, para que uma falha
+        de rede repita apenas a parte afetada. Os dois grupos dividem
+        upload_workers, que limita o total de envios simultâneos.
+        
+        Args:
+            bucket: Bucket de destino
+            diretorio: Diretório base dos caminhos relativos
+            prefixo: Prefixo dos nomes no bucket (bucket_path do corpus)
+            pendentes: Lista de (arquivo, caminho relativo com "/", tamanho)
+            
+        Returns:
+            None ou a exceção de cada envio, na ordem de `pendentes`
+        """
+        max_workers = min(self.config.get('upload_workers', 16), len(pendentes))
+        resultados: List[Optional[Exception]] = [None] * len(pendentes)
+        pequenos = []
+        grandes = []
+        for indice, (_, _, tamanho) in enumerate(pendentes):
+            (grandes if tamanho > _LIMITE_ENVIO_EM_PARTES else pequenos).append(indice)
+        
+        # Com o transfer_manager, o lote de pequenos roda em paralelo ao pool
+        # dos grandes: dividir os workers para não ultrapassar max_workers
+        workers_pool = workers_lote = max_workers
+        if transfer_manager is not None and pequenos and grandes:
+            workers_pool = min(len(grandes), max(1, max_workers // 2))
+            workers_lote = max_workers - workers_pool
+        
+        with ThreadPoolExecutor(max_workers=workers_pool, thread_name_prefix="validai_upload") as executor:
+            futuros = {}
+            for indice in grandes:
+                arquivo, relativo, tamanho = pendentes[indice]
+                futuros[indice] = executor.submit(
+                    _enviar_em_partes, bucket.blob(f"{prefixo}/{relativo}"), arquivo, tamanho
+                )
+            
+            if transfer_manager is None:
+                for indice in pequenos:
+                    arquivo, relativo, _ = pendentes[indice]
+                    futuros[indice] = executor.submit(
+                        bucket.blob(f"{prefixo}/{relativo}").upload_from_filename, arquivo
+                    )
+            elif pequenos:
+                if workers_lote == 0:
+                    # Um único worker: enviar os pequenos após os grandes
+                    wait(futuros.values())
+                    workers_lote = max_workers
+                erros = transfer_manager.upload_many_from_filenames(
+                    bucket,
+                    filenames=[pendentes[indice][1] for indice in pequenos],
+                    source_directory=str(diretorio),
+                    blob_name_prefix=f"{prefixo}/",
+                    max_workers=workers_lote,
+                    worker_type=transfer_manager.THREAD,
+                )
+                for indice, erro in zip(pequenos, erros):
+                    resultados[indice] = erro
+            
+            for indice, futuro in futuros.items():
+                resultados[indice] = futuro.exception()
+        
+        return resultados
+    
     def criar_corpus_rag(self, corpus_id: str) -> str:
         """
         Cria um corpus RAG no Vertex AI
@@ -399,6 +814,76 @@ class ValidAIRAGManager:
             
         except Exception as e:
             raise RuntimeError(f"❌ Erro no processamento: {e}")
+        
+        self._acompanhar_importacao(corpus_id, corpus_rag.name)
+    
+    def _acompanhar_importacao(self, corpus_id: str, nome_corpus: str) -> None:
+        """Inicia (ou reinicia) a thread que aguarda a conclusão da importação"""
+        self._cancelar_importacao(corpus_id)
+        
+        cancelado = threading.Event()
+        thread = threading.Thread(
+            target=self._aguardar_importacao,
+            args=(corpus_id, nome_corpus, cancelado),
+            name=f"validai-import-{corpus_id}",
+            daemon=True
+        )
+        self._import_jobs[corpus_id] = (thread, cancelado)
+        thread.start()
+    
+    def _cancelar_importacao(self, corpus_id: str) -> None:
+        """Interrompe o acompanhamento de importação de um corpus, se houver"""
+        job = self._import_jobs.pop(corpus_id, None)
+        if job is not None:
+            job[1].set()
+    
+    def _aguardar_importacao(self, corpus_id: str, nome_corpus: str,
+                             cancelado: threading.Event) -> None:
+        """
+        Consulta os arquivos do corpus com backoff exponencial até a importação estabilizar
+        
+        A importação é considerada concluída quando o corpus tem arquivos e a
+        contagem fica inalterada por pelo menos `import_estavel_s` segundos
+        (arquivos grandes podem levar vários ciclos de consulta para aparecer);
+        a ferramenta de busca é então criada e o corpus passa a aparecer como
+        pronto na interface.
+        """
+        espera = 1.0
+        limite = time.monotonic() + self.config.get('import_poll_timeout_s', 1800)
+        janela_estavel = self.config.get('import_estavel_s', 60)
+        contagem_anterior = -1
+        estavel_desde = time.monotonic()
+        
+        while not cancelado.wait(espera):
+            try:
+                contagem = sum(1 for _ in rag.list_files(nome_corpus))
+            except Exception as e:
+                logger.debug(f"Falha ao listar arquivos de {corpus_id}: {e}")
+                contagem = -1
+            
+            agora = time.monotonic()
+            if contagem <= 0 or contagem != contagem_anterior:
+                estavel_desde = agora
+            elif agora - estavel_desde >= janela_estavel:
+                try:
+                    if corpus_id not in self.ferramentas_busca:
+                        self.criar_ferramenta_busca(corpus_id)
+                    logger.info(f"✅ Importação concluída: {corpus_id} ({contagem} arquivos)")
+                except Exception as e:
+                    logger.error(f"❌ Erro ao preparar corpus importado {corpus_id}: {e}")
+                break
+            
+            if agora >= limite:
+                logger.warning(f"⏱️ Importação de {corpus_id} não concluiu no tempo limite")
+                break
+            
+            contagem_anterior = contagem
+            espera = min(espera * 2, 30.0)
+        
+        # Remove apenas o próprio registro (pode ter sido substituído por nova importação)
+        job = self._import_jobs.get(corpus_id)
+        if job is not None and job[1] is cancelado:
+            del self._import_jobs[corpus_id]
     
     def criar_ferramenta_busca(self, corpus_id: str) -> Tool:
         """
@@ -410,16 +895,19 @@ class ValidAIRAGManager:
         Returns:
             Ferramenta de busca configurada
         """
-        if corpus_id not in self.corpus_ativos:
+        if corpus_id in self.corpus_ativos:
+            nome_corpus = self.corpus_ativos[corpus_id].name
+        elif corpus_id in self.corpus_configs and self.corpus_configs[corpus_id].corpus_id:
+            # Corpus criado em sessão anterior (nome persistido na configuração)
+            nome_corpus = self.corpus_configs[corpus_id].corpus_id
+        else:
             raise ValueError(f"Corpus não ativo: {corpus_id}")
         
-        corpus_rag = self.corpus_ativos[corpus_id]
-        
         try:
             ferramenta = Tool(
                 retrieval=Retrieval(
                     vertex_rag_store=VertexRagStore(
-                        rag_corpora=[corpus_rag.name],
+                        rag_corpora=[nome_corpus],
                         similarity_top_k=self.config.get('top_resultados', 10),
                         vector_distance_threshold=self.config.get('limite_similaridade', 0.5),
                     )
@@ -427,6 +915,11 @@ class ValidAIRAGManager:
             )
             
             self.ferramentas_busca[corpus_id] = ferramenta
+            self._registrar_prompt_corpus(corpus_id)
+            
+            # O índice mudou: respostas anteriores podem estar desatualizadas
+            if self._query_cache is not None:
+                self._query_cache.clear()
             logger.info(f"🔧 Ferramenta de busca criada para: {corpus_id}")
             
             return ferramenta
@@ -451,35 +944,82 @@ class ValidAIRAGManager:
         ferramenta = self.ferramentas_busca[corpus_id]
         config = self.corpus_configs[corpus_id]
         
+        chave = _chave_consulta('unico', [corpus_id], pergunta)
+        em_cache = self._resposta_em_cache(chave)
+        if em_cache is not None:
+            logger.info(f"💾 Resposta em cache para {config.nome}: {pergunta[:50]}...")
+            return em_cache
+        
         logger.info(f"🤔 Consultando {config.nome}: {pergunta[:50]}...")
         
         try:
-            # Criar prompt contextualizado
-            prompt_contextualizado = f"""
-            Você está consultando a base de conhecimento: {config.nome}
-            Descrição: {config.descricao}
+            resposta = self.cliente_ia.models.generate_content(
+                model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
+                contents=self._montar_prompt_corpus(corpus_id, pergunta),
+                config=GenerateContentConfig(tools=[ferramenta]),
+            )
             
-            Pergunta do usuário: {pergunta}
+            self._guardar_resposta(chave, resposta.text)
+            return resposta.text
             
-            Por favor, responda baseado exclusivamente no conteúdo desta base de conhecimento.
-            Se a informação não estiver disponível, informe claramente.
-            """
+        except Exception as e:
+            raise RuntimeError(f"❌ Erro na consulta: {e}")
+    
+    def consultar_corpus_stream(self, corpus_id: str, pergunta: str) -> Iterator[str]:
+        """
+        Faz uma consulta a um corpus específico, transmitindo a resposta
+        em trechos conforme o modelo os gera
+        
+        Args:
+            corpus_id: ID do corpus
+            pergunta: Pergunta do usuário
             
-            resposta = self.cliente_ia.models.generate_content(
+        Yields:
+            Trechos de texto da resposta da IA
+        """
+        if corpus_id not in self.ferramentas_busca:
+            raise ValueError(f"Ferramenta de busca não disponível para: {corpus_id}")
+        
+        ferramenta = self.ferramentas_busca[corpus_id]
+        config = self.corpus_configs[corpus_id]
+        
+        logger.info(f"🤔 Consultando (stream) {config.nome}: {pergunta[:50]}...")
+        
+        try:
+            stream = self.cliente_ia.models.generate_content_stream(
                 model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
-                contents=prompt_contextualizado,
+                contents=self._montar_prompt_corpus(corpus_id, pergunta),
                 config=GenerateContentConfig(tools=[ferramenta]),
             )
             
-            return resposta.text
+            for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
             
         except Exception as e:
             raise RuntimeError(f"❌ Erro na consulta: {e}")
     
+    def _montar_prompt_corpus(self, corpus_id: str, pergunta: str) -> str:
+        """Monta o prompt contextualizado para consulta a um corpus"""
+        prefixo = self._prompt_prefixes.get(corpus_id)
+        if prefixo is None:
+            prefixo = self._registrar_prompt_corpus(corpus_id)
+        return prefixo + pergunta + _PROMPT_CORPUS_SUFIXO
+    
+    def _registrar_prompt_corpus(self, corpus_id: str) -> str:
+        """Pré-formata a parte fixa (nome e descrição) do prompt de um corpus"""
+        config = self.corpus_configs[corpus_id]
+        prefixo = _PROMPT_CORPUS_PREFIXO.format(nome=config.nome, descricao=config.descricao)
+        self._prompt_prefixes[corpus_id] = prefixo
+        return prefixo
+    
     def consultar_multiplos_corpus(self, corpus_ids: List[str], pergunta: str) -> str:
         """
         Consulta múltiplos corpus simultaneamente
         
+        Cada corpus é consultado em paralelo com sua própria ferramenta de
+        busca; as respostas são então consolidadas em uma chamada final.
+        
         Args:
             corpus_ids: Lista de IDs dos corpus
             pergunta: Pergunta do usuário
@@ -491,44 +1031,80 @@ class ValidAIRAGManager:
             raise ValueError("Lista de corpus não pode estar vazia")
         
         # Verificar se todos os corpus estão disponíveis
-        ferramentas = []
         nomes_corpus = []
         
         for corpus_id in corpus_ids:
             if corpus_id not in self.ferramentas_busca:
                 raise ValueError(f"Corpus não disponível: {corpus_id}")
             
-            ferramentas.append(self.ferramentas_busca[corpus_id])
             nomes_corpus.append(self.corpus_configs[corpus_id].nome)
         
+        chave_consulta = _chave_consulta('multi', corpus_ids, pergunta)
+        em_cache = self._resposta_em_cache(chave_consulta)
+        if em_cache is not None:
+            logger.info(f"💾 Resposta em cache para: {', '.join(nomes_corpus)}")
+            return em_cache
+        
         logger.info(f"🔍 Consultando múltiplos corpus: {', '.join(nomes_corpus)}")
         
         try:
-            # Criar prompt para consulta múltipla
-            prompt_multiplo = f"""
-            Você está consultando múltiplas bases de conhecimento simultaneamente:
-            {', '.join(nomes_corpus)}
+            # Consultar cada corpus de forma independente e concorrente (no loop compartilhado do cliente aio)
+            respostas = executar_no_loop(self._consultar_corpus_concorrente(corpus_ids, pergunta))
             
-            Pergunta do usuário: {pergunta}
+            # Consolidar as respostas em uma chamada sem ferramentas de busca
+            secoes = "\n\n".join(
+                f"### {nome}\n{resposta}" for nome, resposta in zip(nomes_corpus, respostas)
+            )
+            chave = tuple(sorted(corpus_ids))
+            prefixo = self._multi_prompt_cache.get(chave)
+            if prefixo is None:
+                nomes_ordenados = ', '.join(self.corpus_configs[corpus_id].nome for corpus_id in chave)
+                prefixo = _PROMPT_MULTIPLO_PREFIXO.format(nomes=nomes_ordenados)
+                self._multi_prompt_cache.set(chave, prefixo)
             
-            Por favor:
-            1. Busque informações em todas as bases disponíveis
-            2. Consolide as informações de forma coerente
-            3. Indique quando informações vêm de bases específicas
-            4. Se houver conflitos, mencione as diferentes perspectivas
-            """
+            prompt_consolidacao = prefixo + pergunta + _PROMPT_MULTIPLO_RESPOSTAS + secoes + _PROMPT_MULTIPLO_SUFIXO
             
             resposta = self.cliente_ia.models.generate_content(
                 model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
-                contents=prompt_multiplo,
-                config=GenerateContentConfig(tools=ferramentas),
+                contents=prompt_consolidacao,
             )
             
+            self._guardar_resposta(chave_consulta, resposta.text)
             return resposta.text
             
         except Exception as e:
             raise RuntimeError(f"❌ Erro na consulta múltipla: {e}")
     
+    def _resposta_em_cache(self, chave: Tuple[str, frozenset, str]) -> Optional[str]:
+        """Retorna a resposta recente para a consulta, se o cache estiver ativo"""
+        if self._query_cache is None:
+            return None
+        return self._query_cache.get(chave)
+    
+    def _guardar_resposta(self, chave: Tuple[str, frozenset, str], resposta: Optional[str]) -> None:
+        """Guarda a resposta de uma consulta (respostas vazias não são guardadas)"""
+        if self._query_cache is not None and resposta:
+            self._query_cache.set(chave, resposta)
+    
+    async def _consultar_corpus_concorrente(self, corpus_ids: List[str], pergunta: str) -> List[str]:
+        """Consulta vários corpus em paralelo, limitado por `max_concurrency`"""
+        semaforo = asyncio.Semaphore(self.config.get('max_concurrency', 4))
+        return await asyncio.gather(
+            *(self._consultar_corpus_async(corpus_id, pergunta, semaforo) for corpus_id in corpus_ids)
+        )
+    
+    async def _consultar_corpus_async(self, corpus_id: str, pergunta: str,
+                                      semaforo: asyncio.Semaphore) -> str:
+        """Consulta um único corpus com o cliente assíncrono do Gemini"""
+        async with semaforo:
+            resposta = await self.cliente_ia.aio.models.generate_content(
+                model=self.config.get('modelo_ia', 'gemini-1.5-pro-002'),
+                contents=self._montar_prompt_corpus(corpus_id, pergunta),
+                config=GenerateContentConfig(tools=[self.ferramentas_busca[corpus_id]]),
+            )
+        
+        return resposta.text
+    
     def obter_estatisticas_corpus(self, corpus_id: str) -> Dict[str, Any]:
         """
         Obtém estatísticas de um corpus
@@ -572,6 +1148,8 @@ class ValidAIRAGManager:
         config = self.corpus_configs[corpus_id]
         logger.info(f"🗑️ Removendo corpus: {config.nome}")
         
+        self._cancelar_importacao(corpus_id)
+        
         try:
             # Remover corpus do Vertex AI
             if corpus_id in self.corpus_ativos:
@@ -587,6 +1165,9 @@ class ValidAIRAGManager:
             
             # Limpar referência
             config.corpus_id = None
+            self._file_stats_cache.delete(corpus_id)
+            if self._query_cache is not None:
+                self._query_cache.clear()
             
             logger.info(f"✅ Corpus {config.nome} limpo com sucesso")
             
@@ -602,8 +1183,13 @@ class ValidAIRAGManager:
             for nome, config in self.corpus_configs.items():
                 config_data[nome] = config.to_dict()
             
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            # Escrita atômica: arquivo temporário + os.replace
+            arquivo_temp = f"{config_file}.tmp"
+            with open(arquivo_temp, 'wb') as f:
+                f.write(_dumps(config_data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(arquivo_temp, config_file)
             
             logger.info(f"✅ Configurações salvas em: {config_file}")
             
@@ -621,7 +1207,15 @@ class ValidAIRAGInterface:
     def __init__(self, rag_manager: ValidAIRAGManager):
         self.rag_manager = rag_manager
         self.corpus_selecionado = None
-        self.historico_consultas = []
+        # Histórico limitado: as consultas mais antigas são descartadas
+        self.historico_consultas = deque(
+            maxlen=rag_manager.config.get('history_maxlen', 500)
+        )
+        # Pool reaproveitado para verificar os corpus em paralelo
+        self._status_pool = ThreadPoolExecutor(
+            max_workers=max(1, len(rag_manager.corpus_configs)),
+            thread_name_prefix="validai_status"
+        )
     
     def obter_opcoes_corpus(self) -> List[Tuple[str, str]]:
         """
@@ -631,15 +1225,23 @@ class ValidAIRAGInterface:
             Lista de tuplas (nome_exibicao, corpus_id)
         """
         opcoes = []
-        
-        for corpus_id, config in self.rag_manager.corpus_configs.items():
-            if config.ativo:
-                # Verificar se tem arquivos
-                info = self.rag_manager.verificar_arquivos_corpus(corpus_id)
-                status = "✅" if info['arquivos_validos'] > 0 else "⚠️"
-                
-                nome_exibicao = f"{status} {config.nome} ({info['arquivos_validos']} docs)"
-                opcoes.append((nome_exibicao, corpus_id))
+        ativos = [
+            (corpus_id, config)
+            for corpus_id, config in self.rag_manager.corpus_configs.items()
+            if config.ativo
+        ]
+        
+        # Verificar os arquivos de todos os corpus em paralelo (map preserva a ordem)
+        infos = self._status_pool.map(
+            self.rag_manager.verificar_arquivos_corpus,
+            [corpus_id for corpus_id, _ in ativos]
+        )
+        
+        for (corpus_id, config), info in zip(ativos, infos):
+            status = "✅" if info['arquivos_validos'] > 0 else "⚠️"
+            
+            nome_exibicao = f"{status} {config.nome} ({info['arquivos_validos']} docs)"
+            opcoes.append((nome_exibicao, corpus_id))
         
         return opcoes
     
@@ -647,6 +1249,21 @@ class ValidAIRAGInterface:
         """
         Seleciona um corpus para consultas
         
+        Args:
+            corpus_id: ID do corpus
+            
+        Returns:
+            Mensagem de status
+        """
+        if corpus_id in self.rag_manager.corpus_configs:
+            self.corpus_selecionado = corpus_id
+        
+        return self.status_corpus(corpus_id)
+    
+    def status_corpus(self, corpus_id: str) -> str:
+        """
+        Descreve o status de um corpus sem alterar a seleção atual
+        
         Args:
             corpus_id: ID do corpus
             
@@ -659,7 +1276,6 @@ class ValidAIRAGInterface:
         if corpus_id not in self.rag_manager.corpus_configs:
             return f"❌ Corpus não encontrado: {corpus_id}"
         
-        self.corpus_selecionado = corpus_id
         config = self.rag_manager.corpus_configs[corpus_id]
         
         # Verificar status
@@ -674,17 +1290,19 @@ class ValidAIRAGInterface:
         
         return f"✅ {config.nome} pronto para consultas ({info['arquivos_validos']} documentos)"
     
-    def processar_consulta(self, pergunta: str) -> str:
+    def processar_consulta(self, pergunta: str, corpus_id: Optional[str] = None) -> str:
         """
         Processa uma consulta do usuário
         
         Args:
             pergunta: Pergunta do usuário
+            corpus_id: Corpus consultado (padrão: corpus selecionado)
             
         Returns:
             Resposta da IA
         """
-        if not self.corpus_selecionado:
+        corpus_id = corpus_id or self.corpus_selecionado
+        if not corpus_id:
             return "⚠️ Selecione um corpus antes de fazer perguntas"
         
         if not pergunta.strip():
@@ -692,25 +1310,25 @@ class ValidAIRAGInterface:
         
         try:
             # Verificar se ferramenta está disponível
-            if self.corpus_selecionado not in self.rag_manager.ferramentas_busca:
+            if corpus_id not in self.rag_manager.ferramentas_busca:
                 return "🔧 Corpus ainda não está pronto. Aguarde o processamento..."
             
             # Fazer consulta
             resposta = self.rag_manager.consultar_corpus(
-                self.corpus_selecionado, 
+                corpus_id, 
                 pergunta
             )
             
             # Adicionar ao histórico
             self.historico_consultas.append({
                 'timestamp': datetime.now().isoformat(),
-                'corpus': self.corpus_selecionado,
+                'corpus': corpus_id,
                 'pergunta': pergunta,
                 'resposta': resposta
             })
             
             # Adicionar cabeçalho informativo
-            config = self.rag_manager.corpus_configs[self.corpus_selecionado]
+            config = self.rag_manager.corpus_configs[corpus_id]
             cabecalho = f"**📚 Consultando: {config.nome}**\n\n"
             
             return cabecalho + resposta
@@ -718,6 +1336,51 @@ class ValidAIRAGInterface:
         except Exception as e:
             return f"❌ Erro na consulta: {str(e)}"
     
+    def processar_consulta_stream(self, pergunta: str,
+                                  corpus_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Processa uma consulta do usuário transmitindo a resposta em trechos
+        
+        Args:
+            pergunta: Pergunta do usuário
+            corpus_id: Corpus consultado (padrão: corpus selecionado)
+            
+        Yields:
+            Cabeçalho informativo seguido dos trechos da resposta da IA
+            
+        Raises:
+            RuntimeError: Se a consulta falhar durante a geração
+        """
+        corpus_id = corpus_id or self.corpus_selecionado
+        if not corpus_id:
+            yield "⚠️ Selecione um corpus antes de fazer perguntas"
+            return
+        
+        if not pergunta.strip():
+            yield "⚠️ Digite uma pergunta válida"
+            return
+        
+        # Verificar se ferramenta está disponível
+        if corpus_id not in self.rag_manager.ferramentas_busca:
+            yield "🔧 Corpus ainda não está pronto. Aguarde o processamento..."
+            return
+        
+        config = self.rag_manager.corpus_configs[corpus_id]
+        yield f"**📚 Consultando: {config.nome}**\n\n"
+        
+        trechos = []
+        for trecho in self.rag_manager.consultar_corpus_stream(corpus_id, pergunta):
+            trechos.append(trecho)
+            yield trecho
+        
+        # Adicionar ao histórico
+        self.historico_consultas.append({
+            'timestamp': datetime.now().isoformat(),
+            'corpus': corpus_id,
+            'pergunta': pergunta,
+            'resposta': "".join(trechos)
+        })
+    
     def obter_status_sistema(self) -> str:
         """
         Obtém status geral do sistema RAG
@@ -761,6 +1424,17 @@ def criar_configuracao_rag_padrao() -> Dict[str, Any]:
         'top_resultados': 10,
         'limite_similaridade': 0.5,
         'tamanho_max_arquivo_mb': 50,
+        'upload_workers': 16,
+        'max_concurrency': 4,
+        'http_max_connections': 32,
+        'stat_cache_ttl_s': 5.0,
+        'history_maxlen': 500,
+        'warmup_on_init': True,
+        'import_poll_timeout_s': 1800,
+        'import_estavel_s': 60,
+        'enable_query_cache': True,
+        'query_cache_size': 128,
+        'query_cache_ttl_s': 600,
         'corpus_config_file': 'rag_corpus_config.json'
     }
 